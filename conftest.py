@@ -0,0 +1,47 @@
+"""
+Every use case is a directory of its own whose modules import each other by bare
+name, and several use cases have modules with the same name (checkers,
+GEMMA_Interfaces, ...). When the tests of several use cases run in the same
+session, the modules of the use case of each test module are swapped into
+sys.modules and its directory is put first in sys.path, before the test module
+is imported and before each of its tests runs (for the modules imported lazily).
+"""
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+modules = {}                      # use case directory --> its modules imported so far, while another use case is active
+current = None
+
+
+def use_case(path):
+    return os.path.join(ROOT, os.path.relpath(os.path.abspath(str(path)), ROOT).split(os.sep)[0])
+
+
+def owned(module, directory):
+    path = getattr(module, "__file__", None)
+    return path is not None and os.path.abspath(path).startswith(directory + os.sep)
+
+
+def activate(directory):
+    global current
+    if directory == current:
+        return
+    if current is not None:
+        modules[current] = {name: module for name, module in sys.modules.items() if owned(module, current)}
+        for name in modules[current]:
+            del sys.modules[name]
+    sys.path[:] = [p for p in sys.path if os.path.dirname(os.path.abspath(p or os.curdir)) != ROOT]
+    sys.path.insert(0, directory)
+    sys.modules.update(modules.pop(directory, {}))
+    current = directory
+
+
+def pytest_collectstart(collector):
+    if isinstance(collector, pytest.Module):
+        activate(use_case(collector.path))
+
+
+def pytest_runtest_setup(item):
+    activate(use_case(item.path))
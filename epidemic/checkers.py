@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class CallConditionsChecker():
 
 	def checkCallConditionsMobility(self, submodel, *args):
@@ -7,6 +10,10 @@ class CallConditionsChecker():
 		else:
 			return False
 
+	def checkCallConditionsMobilityBatch(self, submodel, *args):   #same as checkCallConditionsMobility, on arrays of scenarios
+		S, E, I =  args
+		return (S > 0) & ((E + I) > 0)
+
 	def checkCallConditionsODE (self, submodel, *args):   #the ODE model is called every update_frequency steps
 		pass
 		
@@ -40,4 +47,13 @@ class ConsistencyChecker ():
 		print ("iji  ", S, " ", E, "  ", I, "  ", R)
 		return S, E, I, R  
 
+
+	def checkConsistencyODEBatch (self, submodel, *args):     #same as checkConsistencyODE, on arrays of scenarios
+		population_size, S, E, I, R = args
+		continuous_loss = np.maximum(population_size - (S + E + I + R), 0)
+		to_I = (E > I) & (E > R)
+		I = I + np.where(to_I, continuous_loss, 0)
+		R = R + np.where(to_I, 0, continuous_loss)
+		return S, E, I, R
+
 		
\ No newline at end of file
@@ -0,0 +1,41 @@
+import numpy as np
+
+
+#unused here    
+def SEIR_model(state : tuple, time : np.ndarray, 
+               β : float, σ : float, γ : float) -> tuple:
+    S, E, I, R = state
+    δS = - β*I*S
+    δE = + β*I*S - σ*E
+    δI = + σ*E - γ*I
+    δR = + γ*I
+    return δS, δE, δI, δR 
+
+
+#like the SEIR model, but describing only transition from E to I and from I to R    
+def EIR_model(state : tuple, time : np.ndarray, 
+               σ : float, γ : float) -> tuple:
+    E, I, R = state
+    δE = - σ*E
+    δI = + σ*E - γ*I
+    δR = + γ*I
+    return δE, δI, δR 
+
+
+#exact solution of the EIR model: the state after a time t is P @ (E, I, R), where P is a 3x3 propagator depending only on σ, γ and t
+def EIR_propagator(σ : float, γ : float, t : float) -> np.ndarray:
+    σ, γ = np.asarray(σ, dtype=float), np.asarray(γ, dtype=float)
+    eσ, eγ = np.exp(-σ*t), np.exp(-γ*t)
+    #fraction of E that is in I at time t: σ*(eσ - eγ)/(γ - σ), written as σ*t*exp(-a*t)*(1 - exp(-x))/x
+    #with a = min(σ, γ) and x = |γ - σ|*t, so that it stays accurate when σ and γ are close and tends to σ*t*eσ when σ == γ
+    a, x = np.minimum(σ, γ), np.abs(γ - σ)*t
+    ratio = np.where(x > 0, -np.expm1(-x)/np.where(x > 0, x, 1), 1)
+    δEI = σ*t*np.exp(-a*t)*ratio
+    P = np.zeros(np.broadcast(σ, γ).shape + (3, 3))
+    P[..., 0, 0] = eσ
+    P[..., 1, 0] = δEI
+    P[..., 2, 0] = 1 - eσ - δEI
+    P[..., 1, 1] = eγ
+    P[..., 2, 1] = 1 - eγ
+    P[..., 2, 2] = 1
+    return P
@@ -0,0 +1,107 @@
+#!/bin/python3
+import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from seir import Launcher
+
+
+def run_realization(index, seed, population_size, total_steps, σ, γ, persistent_mobility, mobility_backend):
+    #run the whole director loop once, with its own random stream, and return its (total_steps, 4) trajectory
+    director = Launcher(σ, γ, resultFile=None)
+    #every realization writes its own timing and contact files, the workers being all rank 0
+    director.instantiate_sub_models(persistent_mobility, mobility_backend, seed, log_name="realization_" + str(index))
+    director.setup(total_steps, population_size=population_size)
+    director.advance(total_steps)
+    trajectory = np.zeros((total_steps, 4), dtype=np.int64)
+    trajectory[:] = (director.S, director.E, director.I, director.R)        #if the epidemic ends early, the last state lasts until the end
+    if director.history:
+        trajectory[:len(director.history)] = director.history
+    return trajectory
+
+
+class EnsembleStatistics:
+    """
+    Per-step statistics of S, E, I, R over the realizations of an ensemble,
+    updated one trajectory at a time so that the trajectories never need to be
+    kept in memory. Mean and variance are exact (Welford's algorithm); the
+    quantiles are read from a histogram of ``bins`` equal bins covering
+    0..population_size, so they are exact up to the bin width.
+
+    Args:
+        total_steps: number of steps of every trajectory
+        population_size: number of individuals, upper bound of every compartment
+        bins: number of histogram bins used for the quantiles
+    """
+
+    def __init__(self, total_steps, population_size, bins=1000):
+        self.count = 0
+        self.mean = np.zeros((total_steps, 4))
+        self.m2 = np.zeros((total_steps, 4))
+        bins = max(1, min(bins, population_size + 1))                       #at most one bin per value 0..population_size
+        self.edges = np.linspace(-0.5, population_size + 0.5, bins + 1)       #with one bin per value, every count sits at the centre of its bin
+        self.histogram = np.zeros((total_steps, 4, bins), dtype=np.int64)
+
+    def add(self, trajectory):
+        self.count += 1
+        delta = trajectory - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (trajectory - self.mean)
+        bins = np.clip(np.searchsorted(self.edges, trajectory, side='right') - 1, 0, self.histogram.shape[-1] - 1)
+        steps, compartments = np.indices(trajectory.shape)
+        np.add.at(self.histogram, (steps, compartments, bins), 1)
+
+    def variance(self):
+        return self.m2 / max(self.count - 1, 1)
+
+    def quantiles(self, q):
+        """
+        Returns:
+            An array of shape (len(q), total_steps, 4) with the requested quantiles.
+        """
+        q = np.atleast_1d(q)
+        cdf = np.cumsum(self.histogram, axis=-1)
+        result = np.zeros((len(q),) + cdf.shape[:-1])
+        for i, target in enumerate(q * self.count):
+            # first bin where the cumulative count reaches the target, then linear interpolation inside it
+            b = np.minimum((cdf < target).sum(axis=-1), cdf.shape[-1] - 1)
+            inside = np.take_along_axis(self.histogram, b[..., None], axis=-1)[..., 0]
+            below = np.take_along_axis(cdf, b[..., None], axis=-1)[..., 0] - inside
+            fraction = np.clip((target - below) / np.maximum(inside, 1), 0, 1)
+            result[i] = self.edges[b] + fraction * (self.edges[b + 1] - self.edges[b])
+        return np.clip(result, 0, self.edges[-1] - 0.5)
+
+
+def run_ensemble(realizations, population_size, total_steps=20, σ=1, γ=0.1, processes=None, seed=None, bins=1000,
+                 persistent_mobility=False, mobility_backend="repast"):
+    """
+    Runs ``realizations`` independent realizations of the epidemic model (Launcher
+    plus MobilityModel) on a pool of ``processes`` worker processes. Every
+    realization gets its own seed, spawned from ``seed``, and keeps its results in
+    memory; the trajectories are folded into an EnsembleStatistics as they arrive.
+
+    Returns:
+        The EnsembleStatistics of the ensemble.
+    """
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(realizations)]
+    statistics = EnsembleStatistics(total_steps, population_size, bins)
+    with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(run_realization, i, s, population_size, total_steps, σ, γ, persistent_mobility, mobility_backend) for i, s in enumerate(seeds)]
+        for future in as_completed(futures):
+            statistics.add(future.result())
+    return statistics
+
+
+if __name__ == "__main__":
+
+    total_steps = 20
+    population_size, realizations = int(sys.argv[1]), int(sys.argv[2])
+    statistics = run_ensemble(realizations, population_size, total_steps)
+    mean, std = statistics.mean, np.sqrt(statistics.variance())
+    low, median, high = statistics.quantiles([0.05, 0.5, 0.95])
+    for step in range(total_steps):
+        line = "at step " + str(step + 1)
+        for k, compartment in enumerate("SEIR"):
+            line += " " + compartment + " = %.1f ± %.1f (median %.0f, 90%% in [%.0f, %.0f]);" % (mean[step, k], std[step, k], median[step, k], low[step, k], high[step, k])
+        print(line)
+    print ("Ensemble Ended")
@@ -0,0 +1,122 @@
+#!/bin/python3
+import sys
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import expm_multiply
+from seir import Launcher
+from eir import EIR_propagator
+from mobility_model import MobilityModel
+
+
+def integer_split(values, totals):
+    """
+    Rounds every row of ``values`` to integers that add up to the matching
+    element of ``totals``: values are rounded down, and the missing units go to
+    the elements with the largest fractional parts.
+    """
+    values = np.atleast_2d(values)
+    rounded = np.floor(values).astype(np.int64)
+    missing = np.asarray(totals, dtype=np.int64) - rounded.sum(axis=1)
+    order = np.argsort(-(values - rounded), axis=1, kind='stable')
+    position = np.empty_like(order)
+    np.put_along_axis(position, order, np.arange(values.shape[1])[None, :].repeat(values.shape[0], axis=0), axis=1)
+    return rounded + (position < missing[:, None])
+
+
+class MetapopulationLauncher(Launcher):
+    """
+    Multi-region variant of the Launcher. Every region has its own S, E, I, R
+    compartments, held in arrays, and its own mobility sub-model, run only when
+    the call conditions of the region hold. The regions are coupled by a sparse
+    travel matrix: travel[i, j] is the rate at which the individuals of region i
+    move to region j, in the time unit of the EIR model.
+
+    At every step the EIR model of all the regions is advanced at once with the
+    exact propagator, then the travel is applied with the exponential of its
+    sparse generator; since the rates σ and γ are the same for every region the
+    two operators commute and the result is the exact solution of the coupled
+    system. The travelling individuals are rounded so that the overall population
+    is preserved.
+
+    Args:
+        travel: square (regions x regions) matrix of travel rates, dense or sparse
+    """
+
+    def __init__ (self, travel, σ=None, γ=None, resultFile="res.npy"):
+        super().__init__(σ, γ, resultFile)
+        self.travel = sparse.csr_matrix(travel)
+        self.regions = self.travel.shape[0]
+        #generator of the travel, dX/dt = M X with M = travel^T - diag(rate at which each region is left)
+        self.generator = (self.travel.T - sparse.diags(np.asarray(self.travel.sum(axis=1)).ravel())).tocsr()
+
+
+    def instantiate_sub_models (self, persistent_mobility=False, mobility_backend="repast", seed=None, log_name=''):
+        for region in range(self.regions):
+            name = "mobility_" + str(region)
+            #every region writes its own timing and contact files
+            self.sub_models [name] = MobilityModel(persistent=persistent_mobility, backend=mobility_backend, seed=seed,
+                                                   log_name=(log_name + "_" if log_name else "") + name)
+
+
+    def setup(self, total_steps, population_size, initial_exposed=10):
+        self.parameters["population_size"] = np.broadcast_to(population_size, self.regions).astype(np.int64)
+        self.parameters["initial_exposed"] = np.broadcast_to(initial_exposed, self.regions).astype(np.int64)
+        self.parameters ["duration"] = 0.15                         #duration of the continuous model execution
+        self.parameters["total_steps"] = total_steps
+        self.propagator = EIR_propagator(self.σ, self.γ, self.parameters["duration"])
+        self.S = self.parameters["population_size"] - self.parameters["initial_exposed"]
+        self.E = self.parameters["initial_exposed"].copy()
+        self.I, self.R = np.zeros(self.regions, dtype=np.int64), np.zeros(self.regions, dtype=np.int64)
+        self.results = np.zeros((total_steps, self.regions, 4), dtype=np.int64)
+
+
+    def advance(self, dt):
+        if self.rank != 0:
+            self.serve_mobility()
+            return
+        step = 0
+        while (((self.E > 0) | (self.I > 0)).any() and step < self.parameters["total_steps"]):           #repeat until epidemic is over in every region or the assigned number of steps has been executed
+            for region in np.flatnonzero(self.checkCallConditionsMobilityBatch(self, self.S, self.E, self.I)):
+                name = "mobility_" + str(region)
+                new_infected = self.run_mobility(self.S[region], self.E[region], self.I[region], self.R[region], name)
+                self.S[region], self.E[region] = self.sub_models[name].check_consistency(self, new_infected, self.S[region], self.E[region])
+
+            newE, newI, newR = np.floor(self.propagator @ np.stack((self.E, self.I, self.R))).astype(np.int64)   #run EIR model of every region
+            self.S, self.E, self.I, self.R = self.checkConsistencyODEBatch(self, self.parameters["population_size"], self.S, newE, newI, newR)
+
+            if self.travel.nnz > 0:
+                self.apply_travel()
+
+            self.results[step] = np.stack((self.S, self.E, self.I, self.R), axis=-1)
+            step+=1
+            print("Step " + str(step) + " has ended")
+        self.results[step:] = np.stack((self.S, self.E, self.I, self.R), axis=-1)                          #if the epidemic ends early, the last state lasts until the end
+        self.comm.bcast(None, root=0)                                                                       #the other ranks can stop waiting for mobility rounds
+
+
+    def apply_travel(self):
+        compartments = np.stack((self.S, self.E, self.I, self.R), axis=-1).astype(float)
+        compartments = np.maximum(expm_multiply(self.generator * self.parameters["duration"], compartments), 0)
+        population = integer_split(compartments.sum(axis=1)[None, :], [self.parameters["population_size"].sum()])[0]
+        self.S, self.E, self.I, self.R = integer_split(compartments, population).T
+        self.parameters["population_size"] = population
+
+
+    def retrieve_results (self, *args):
+        if self.rank != 0 or self.resultFile is None:
+            return
+        np.save(self.resultFile, self.results)                                                              #array of shape (steps, regions, 4) with S, E, I, R of every region at every step
+
+
+if __name__ == "__main__":
+
+    total_steps = 20
+    travel = sparse.load_npz(sys.argv[1])                          #travel matrix saved with scipy.sparse.save_npz
+    population_size = np.loadtxt(sys.argv[2], dtype=np.int64)      #one population size per region
+    director = MetapopulationLauncher(travel)
+    director.instantiate_sub_models ()
+    director.setup(total_steps, population_size)
+    director.advance(total_steps)
+    director.retrieve_results()
+    if director.rank == 0:
+        print ("Simulation Ended")
@@ -1,5 +1,8 @@
 import os
 import sys
+import re
+import json
+import time
 from typing import Dict, Tuple
 from mpi4py import MPI
 import numpy as np
@@ -14,25 +17,77 @@ from GEMMA_Interfaces import GEMMA_Component
 from checkers import CallConditionsChecker, ConsistencyChecker
 
 
+BACKENDS = ("repast", "array")
+
+
 class MobilityModel(GEMMA_Component):
 
-    def __init__(self):
-         pass
+    def __init__(self, persistent=False, backend="repast", seed=None, log_name=''):
+        super().__init__()
+        if backend not in BACKENDS:
+            raise ValueError("unknown mobility backend '" + str(backend) + "', expected one of " + str(BACKENDS))
+        self.parameters["persistent"] = persistent      #if True, the world and its walkers are built once and reused in every round
+        self.parameters["backend"] = backend            #"repast" for the agent-based Model, "array" for the vectorized ArrayModel
+        self.parameters["seed"] = seed                  #if not None, overrides random.seed of random_walk.yaml
+        self.parameters["log_name"] = log_name          #included in the names of the timing and contact files, which must differ between sub-models and processes
+        self.comm = MPI.COMM_WORLD
+        self.active = backend == "repast" or self.comm.Get_rank() == 0      #the array engine is not distributed and only runs on rank 0
+        self.model = None
+        self.contacts = None
+        self.population = None                          #number of walkers of the persistent model
 
     def setup (self, *args):
         self.S, self.E, self.I, self.R = args
-        if (os.path.exists ("output/meet_log.csv")):
-            os.system ("rm output/*")
-        
+        if self.parameters["persistent"] and self.active:
+            #the walkers can only be relabelled while the population is the same, e.g. travel between regions changes it
+            population = sum(int(count) for count in args)
+            if self.model is None or population != self.population:
+                self.params = self.read_params()
+                self.model = self.build_model(self.params)
+                self.population = population
+            else:
+                self.model.relabel(self.S, self.E, self.I, self.R)
+
+    def read_params(self):
+        overrides = {} if self.parameters["seed"] is None else {"random.seed": int(self.parameters["seed"])}
+        params = parameters.init_params("random_walk.yaml", json.dumps(overrides))
+        if self.contacts is None and params.get('contacts.dir') and self.active:
+            # the log lives as long as this MobilityModel, across all of its rounds
+            self.contacts = ContactLog(params['contacts.dir'], self.comm.Get_rank(), params.get('contacts.buffer_size', 65536), self.parameters["log_name"])
+        return params
+
+    def build_model(self, params):
+        if self.parameters["backend"] == "array":
+            return ArrayModel(params, self.S, self.E, self.I, self.R, self.contacts)
+        return Model(self.comm, params, self.S, self.E, self.I, self.R, self.contacts, self.parameters["log_name"])
 
     def advance(self, *args):
-        params = parameters.init_params("random_walk.yaml", '{}')
-        run(params, self.S, self.E, self.I, self.R)
-        self.retrieve_results()
+        # every rank must take part in the round: the new infected found by each
+        # rank are summed up, or shared by rank 0 when it runs the model alone
+        if self.parameters["backend"] == "array":
+            new_infected = self.comm.bcast(self.run_model() if self.active else None, root=0)
+        else:
+            new_infected = self.comm.allreduce(self.run_model(), op=MPI.SUM)
+        self.result = MobilityResult(new_infected=new_infected)
+        return self.retrieve_results()
+
+    def run_model(self):
+        """
+        Runs a round of the model in this process.
+
+        Returns:
+            The number of new infected among the walkers of this process.
+        """
+        if self.parameters["persistent"]:
+            self.model.resume(self.params['stop.at'])
+            return self.model.new_infected
+        params = self.read_params()
+        model = self.build_model(params)
+        model.start()
+        return model.new_infected
 
     def retrieve_results (self):
-        with open('output.txt', 'w') as f:
-            print (counter, file=f)
+        return self.result
 
     def check_call_conditions (self, checker, *args):
         return checker.checkCallConditionsMobility(self,*args)
@@ -42,7 +97,18 @@ class MobilityModel(GEMMA_Component):
         return checker.checkConsistencyMobility(self, *args)
 
 
-counter=0
+@dataclass
+class MobilityResult:
+    """
+    Outcome of a round of the mobility model, handed back to the director.
+
+    Args:
+        new_infected: number of susceptible walkers that got exposed during the round
+        from_surrogate: True if new_infected is an estimate of a surrogate instead of the outcome of the model
+    """
+    new_infected: int
+    from_surrogate: bool = False
+
 
 class Walker(core.Agent):
 
@@ -60,7 +126,7 @@ class Walker(core.Agent):
         Returns:
             The saved state of this Walker.
         """
-        return (self.uid, self.meet_count, self.pt.coordinates)
+        return (self.uid, self.pt.coordinates, self.state)
 
     def walk(self, grid):
         # choose two elements from the OFFSET array
@@ -69,35 +135,104 @@ class Walker(core.Agent):
         xy_dirs = random.default_rng.choice(Walker.OFFSETS, size=2)
         self.pt = grid.move(self, dpt(self.pt.x + xy_dirs[0], self.pt.y + xy_dirs[1], 0))
 
-    def count_colocations(self, grid):
-        global counter
-        ag = grid.get_agents(self.pt)
-        for a in ag:
-            if a.state == 'S' and a.id != self.id:
-                #print (a.state + str(self.pt))
-                a.state = 'E'
-                counter +=1
+    def count_colocations(self, kernel):
+        """Exposes this susceptible Walker if it gets infected by the infected
+        walkers within the infection radius, either local or ghosts from a
+        neighbouring rank. Only the rank owning a walker changes its state, so
+        no exposure is lost when the context is synchronized.
+
+        Args:
+            kernel: the InfectionKernel indexing the infected walkers of this tick
+
+        Returns:
+            The infected walker that exposed this Walker, None if it was not exposed.
+        """
+        infector = kernel.infector(self.pt.x, self.pt.y)
+        if infector is not None:
+            self.state = 'E'
+        return infector
+
+STATES = ('S', 'E', 'I', 'R')
+
 
-walker_cache = {}
+def kernel_offsets(radius):
+    """
+    Returns:
+        The (dx, dy) offsets of the cells whose distance from a cell is at most ``radius``, as an array of shape (n, 2).
+    """
+    r = int(np.floor(radius))
+    dx, dy = np.mgrid[-r:r + 1, -r:r + 1]
+    inside = dx ** 2 + dy ** 2 <= radius ** 2
+    return np.stack((dx[inside], dy[inside]), axis=-1)
 
 
-def restore_walker(walker_data: Tuple):
+class InfectionKernel:
+    """
+    Distance-based infection rule: a susceptible walker is in contact with
+    every infected walker whose cell is within ``radius`` cells, and each
+    contact transmits the infection with ``probability``. With radius 0 and
+    probability 1, a walker is exposed whenever it shares its cell with an
+    infected walker.
+
+    The infected walkers are kept in a cell list, rebuilt once per tick, so
+    that the work of a query only depends on the number of cells within the
+    radius and not on the size of the grid.
+
+    Args:
+        radius: infection radius, in cells
+        probability: probability that a contact transmits the infection
+    """
+
+    def __init__(self, radius=0, probability=1.0):
+        self.radius = radius
+        self.probability = probability
+        self.offsets = [tuple(offset) for offset in kernel_offsets(radius).tolist()]
+        self.cells = {}
+
+    def build(self, infected):
+        # infected is an iterable of infected walkers, with up to date positions
+        self.cells = {}
+        for walker in infected:
+            self.cells.setdefault((walker.pt.x, walker.pt.y), []).append(walker)
+
+    def infector(self, x, y):
+        """
+        Returns:
+            The infected walker that infects a susceptible walker in (x, y), None if there is no infection.
+        """
+        contacts = 0
+        infector = None
+        for dx, dy in self.offsets:
+            found = self.cells.get((x + dx, y + dy))
+            if found:
+                contacts += len(found)
+                if infector is None:
+                    infector = found[0]
+        if infector is None or self.probability >= 1:
+            return infector
+        if random.default_rng.random() < 1 - (1 - self.probability) ** contacts:
+            return infector
+        return None
+
+
+def restore_walker(walker_data: Tuple, walker_cache: Dict):
     """
     Args:
         walker_data: tuple containing the data returned by Walker.save.
+        walker_cache: the walkers already restored by the Model, by uid
     """
     # uid is a 3 element tuple: 0 is id, 1 is type, 2 is rank
     uid = walker_data[0]
-    pt_array = walker_data[2]
+    pt_array = walker_data[1]
     pt = dpt(pt_array[0], pt_array[1], 0)
 
     if uid in walker_cache:
         walker = walker_cache[uid]
     else:
-        walker = Walker(uid[0], uid[2], pt)
+        walker = Walker(uid[0], uid[2], pt, walker_data[2])
         walker_cache[uid] = walker
 
-    walker.meet_count = walker_data[1]
+    walker.state = walker_data[2]
     walker.pt = pt
     return walker
 
@@ -112,19 +247,31 @@ class Model:
     Args:
         comm: the mpi communicator over which the model is distributed.
         params: the simulation input parameters
+        S, E, I, R: overall number of walkers in each compartment, partitioned among the ranks
+        contacts: the ContactLog where infection contacts are recorded, if any
+        log_name: name included in the names of the timing files
     """
 
-    def __init__(self, comm: MPI.Intracomm, params: Dict, S, E, I, R):
-        S = int(S)
-        E = int(E)
-        I = int(I)
-        R = int(R)
+    def __init__(self, comm: MPI.Intracomm, params: Dict, S, E, I, R, contacts=None, log_name=''):
+        start = time.perf_counter()
+        self.comm = comm
+        self.contacts = contacts
+        rank = comm.Get_rank()
+        # this rank only creates its share of each compartment
+        S, E, I, R = (local_share(int(count), rank, comm.Get_size()) for count in (S, E, I, R))
         # create the schedule
         self.runner = schedule.init_schedule_runner(comm)
         self.runner.schedule_repeating_event(1, 1, self.step)
-        self.runner.schedule_repeating_event(1.1, 10, self.log_agents)
         self.runner.schedule_stop(params['stop.at'])
 
+        # per-tick timings of the phases of step, only if a directory for them is given
+        self.timings = PhaseTimings(params['timing.dir'], rank, log_name) if params.get('timing.dir') else None
+
+        # ghosts and walkers received from other ranks, by uid; every Model has its own,
+        # since the uids of the walkers of different Models in the same process overlap
+        self.walker_cache = {}
+        self.synchronized = 0
+
         # create the context to hold the agents and manage cross process
         # synchronization
         self.context = ctx.SharedContext(comm)
@@ -133,54 +280,419 @@ class Model:
         box = space.BoundingBox(0, params['world.width'], 0, params['world.height'], 0, 0)
         # create a SharedGrid of 'box' size with sticky borders that allows multiple agents
         # in each grid location.
+        # the buffer must hold every ghost within the infection radius
+        self.kernel = InfectionKernel(params.get('infection.radius', 0), params.get('infection.probability', 1.0))
         self.grid = space.SharedGrid(name='grid', bounds=box, borders=space.BorderType.Sticky,
-                                     occupancy=space.OccupancyType.Multiple, buffer_size=2, comm=comm)
+                                     occupancy=space.OccupancyType.Multiple, buffer_size=max(2, int(np.ceil(self.kernel.radius))), comm=comm)
         self.context.add_projection(self.grid)
+        self.width = params['world.width']
+        self.height = params['world.height']
 
-        rank = comm.Get_rank()
+        # draw the local x,y locations and the compartments of all the walkers
+        # of this rank at once, then create and add the walkers to the context
         rng = repast4py.random.default_rng
-        for i in range(S + E + I + R):
-            # get a random x,y location in the grid
-            pt = self.grid.get_random_local_pt(rng)
-            # create and add the walker to the context
-            if i < S: 
-            	walker = Walker(i, rank, pt, 'S')
-            elif i < E + S:
-            	walker = Walker(i, rank, pt, 'E')
-            elif i < S + E + I:
-            	walker = Walker(i, rank, pt, 'I')
-            else:
-            	walker = Walker(i, rank, pt, 'R')
-            self.context.add(walker)
-            self.grid.move(walker, pt)
+        bounds = self.grid.get_local_bounds()
+        n = S + E + I + R
+        xs = rng.integers(bounds.xmin, bounds.xmin + bounds.xextent, size=n).tolist()
+        ys = rng.integers(bounds.ymin, bounds.ymin + bounds.yextent, size=n).tolist()
+        states = np.repeat(STATES, [S, E, I, R]).tolist()
+        self.add_walkers(rank, xs, ys, states)
         
         # count the initial colocations at time 0 and log
+        self.new_infected = 0
+        self.count_initial_colocations()
+
+        self.setup_time = time.perf_counter() - start
+        if self.timings is not None:
+            self.timings.record_setup(self.setup_time, n)
+
+    def add_walkers(self, rank, xs, ys, states):
+        add, move = self.context.add, self.grid.move
+        for i, (x, y, state) in enumerate(zip(xs, ys, states)):
+            pt = dpt(x, y, 0)
+            walker = Walker(i, rank, pt, state)
+            add(walker)
+            move(walker, pt)
+
+    def count_initial_colocations(self):
+        # ghosts must carry the current labels before looking for infected walkers
+        self.context.synchronize(self.restore_walker)
+        self.count_colocations()
+
+    def count_colocations(self):
+        self.kernel.build(self.infected_walkers())
         for walker in self.context.agents():
-            if walker.state == 'I':
-                walker.count_colocations(self.grid)
+            if walker.state == 'S':
+                infector = walker.count_colocations(self.kernel)
+                if infector is not None:
+                    self.new_infected += 1
+                    if self.contacts is not None:
+                        self.contacts.record(self.runner.schedule.tick, infector.uid, walker.uid, walker.pt)
+
+    def infected_walkers(self):
+        """
+        Returns:
+            The infected walkers local to this rank and the infected ghosts within
+            the infection radius of the local bounds.
+        """
+        infected = [walker for walker in self.context.agents() if walker.state == 'I']
+        bounds = self.grid.get_local_bounds()
+        r = int(np.ceil(self.kernel.radius))
+        xmax, ymax = bounds.xmin + bounds.xextent, bounds.ymin + bounds.yextent
+        ring_ys = [y for y in range(max(bounds.ymin - r, 0), min(ymax + r, self.height)) if not bounds.ymin <= y < ymax]
+        all_ys = range(max(bounds.ymin - r, 0), min(ymax + r, self.height))
+        # only the cells of the buffer around the local bounds are scanned
+        for x in range(max(bounds.xmin - r, 0), min(xmax + r, self.width)):
+            for y in (ring_ys if bounds.xmin <= x < xmax else all_ys):
+                infected.extend(a for a in self.grid.get_agents(dpt(x, y, 0)) if a.state == 'I')
+        return infected
+
+    def relabel(self, S, E, I, R):
+        """
+        Updates the compartment labels of the existing walkers so that they
+        match the S/E/I/R counts received from the director. Walkers keep their
+        position, and walkers that are further along the S->E->I->R progression
+        are the first ones to be assigned the most advanced labels, so that no
+        walker goes back to an earlier compartment.
+
+        The number of walkers of every compartment that get each label is split
+        among the ranks at random (see relabel_transitions), with a seed shared
+        by all the ranks, and every rank then picks its walkers at random.
+        """
+        rank, rng = self.comm.Get_rank(), repast4py.random.default_rng
+        walkers = list(self.context.agents())
+        state = np.array([STATES.index(w.state) for w in walkers], dtype=np.int8)
+        counts = np.array(self.comm.allgather(np.bincount(state, minlength=len(STATES))))
+        shared = np.random.default_rng(self.comm.bcast(rng.integers(2**63) if rank == 0 else None, root=0))
+        transitions = relabel_transitions(counts, S, E, I, R, shared)[rank]
+        for walker, label in zip(walkers, relabel_walkers(state, transitions, rng)):
+            walker.state = STATES[label]
+        self.new_infected = 0
+        self.count_initial_colocations()
+
+    def resume(self, ticks):
+        """
+        Runs the existing schedule for another ``ticks`` ticks.
+        """
+        self.runner.schedule_stop(self.runner.schedule.tick + ticks)
+        self.runner.go = True
+        self.start()
 
     def step(self):
+        start = time.perf_counter()
+        agents = 0
         for walker in self.context.agents():
             walker.walk(self.grid)
+            agents += 1
 
-        self.context.synchronize(restore_walker)
+        walked = time.perf_counter()
+        self.synchronized = 0
+        self.context.synchronize(self.restore_walker)
 
-        for walker in self.context.agents():
-            if walker.state == 'I':
-                walker.count_colocations(self.grid)
+        synchronized = time.perf_counter()
+        self.count_colocations()
+
+        if self.timings is not None:
+            self.timings.record(self.runner.schedule.tick, walked - start, synchronized - walked,
+                                time.perf_counter() - synchronized, agents, self.synchronized)
 
-        tick = self.runner.schedule.tick
+    def restore_walker(self, walker_data: Tuple):
+        # counts the ghosts and the incoming walkers received in a synchronization
+        self.synchronized += 1
+        return restore_walker(walker_data, self.walker_cache)
 
+    def start(self):
+        self.runner.execute()
+        if self.timings is not None:
+            self.timings.flush()
+        if self.contacts is not None:
+            self.contacts.flush()
 
-    def log_agents(self):
-        tick = self.runner.schedule.tick
 
+class PhaseTimings:
+    """
+    Per-tick instrumentation of Model.step. For every tick it records the wall
+    time of the walk phase, of the synchronization of the context (the MPI
+    exchange of moved walkers and ghosts) and of the colocation phase, the
+    number of walkers local to the rank and the number of walkers received in
+    the synchronization; the time taken to build the Model is logged
+    separately, as a row of tick 0. Each rank appends its rows to its own CSV file in
+    ``directory`` at the end of every round; the files of all the ranks can be
+    put together with merge_timings.
+
+    Args:
+        directory: where to write the timings_<rank>.csv files
+        rank: the rank the timings refer to
+        name: if not empty, the file is timings_<name>_<rank>.csv, so that the
+              Models of different sub-models or processes do not share a file
+    """
+
+    COLUMNS = ('time', 'tick', 'rank', 'walk', 'synchronize', 'colocation', 'agents', 'synchronized', 'setup')
+
+    def __init__(self, directory, rank, name=''):
+        os.makedirs(directory, exist_ok=True)
+        self.path = log_path(directory, 'timings', name, rank, 'csv')
+        self.rank = rank
+        self.rows = []
+        if not os.path.exists(self.path):
+            with open(self.path, 'w') as f:
+                print(','.join(PhaseTimings.COLUMNS), file=f)
+
+    def record(self, tick, walk, synchronize, colocation, agents, synchronized):
+        self.rows.append((time.time(), tick, self.rank, walk, synchronize, colocation, agents, synchronized, 0))
+
+    def record_setup(self, setup, agents):
+        # the construction of a Model is logged as tick 0, with its time in the setup column
+        self.rows.append((time.time(), 0, self.rank, 0, 0, 0, agents, 0, setup))
+
+    def flush(self):
+        with open(self.path, 'a') as f:
+            for row in self.rows:
+                print('%.6f,%g,%d,%.6g,%.6g,%.6g,%d,%d,%.6g' % row, file=f)
+        self.rows = []
+
+
+def log_path(directory, kind, name, rank, extension):
+    # <kind>_<rank>.<extension>, or <kind>_<name>_<rank>.<extension> for a named log
+    return os.path.join(directory, kind + '_' + (name + '_' if name else '') + str(rank) + '.' + extension)
+
+
+def merge_timings(directory, name=''):
+    """
+    Merges the timings_<rank>.csv files (timings_<name>_<rank>.csv for a named
+    log) written by PhaseTimings.
+
+    Returns:
+        A structured NumPy array with one row per rank and tick, sorted by time.
+    """
+    pattern = re.compile('timings_' + (re.escape(name) + '_' if name else '') + r'\d+\.csv')
+    files = sorted(f for f in os.listdir(directory) if pattern.fullmatch(f))
+    tables = [np.atleast_1d(np.genfromtxt(os.path.join(directory, f), delimiter=',', names=True)) for f in files]
+    merged = np.concatenate(tables)
+    return merged[np.argsort(merged['time'], kind='stable')]
+
+
+class ContactLog:
+    """
+    Log of the infection contacts of a rank: tick, infector, infectee and cell
+    of every exposure. Contacts are stored in a preallocated buffer of
+    ``buffer_size`` records and written, in blocks, to the binary file
+    contacts_<rank>.bin in ``directory``, which can be memory-mapped with
+    read_contacts. The file is truncated when the log is created.
+
+    Args:
+        directory: where to write the contacts_<rank>.bin file
+        rank: the rank the contacts refer to
+        buffer_size: number of records kept in memory before writing them
+        name: if not empty, the file is contacts_<name>_<rank>.bin, so that the
+              logs of different sub-models or processes do not truncate each other
+    """
+
+    DTYPE = np.dtype([('tick', np.int32), ('infector_id', np.int64), ('infector_rank', np.int32),
+                      ('infectee_id', np.int64), ('infectee_rank', np.int32), ('x', np.int32), ('y', np.int32)])
+
+    def __init__(self, directory, rank, buffer_size=65536, name=''):
+        os.makedirs(directory, exist_ok=True)
+        self.path = log_path(directory, 'contacts', name, rank, 'bin')
+        self.buffer = np.zeros(int(buffer_size), dtype=ContactLog.DTYPE)
+        self.size = 0
+        open(self.path, 'wb').close()
+
+    def record(self, tick, infector_uid, infectee_uid, pt):
+        # uids are (id, type, rank) tuples
+        if self.size == len(self.buffer):
+            self.flush()
+        self.buffer[self.size] = (tick, infector_uid[0], infector_uid[2], infectee_uid[0], infectee_uid[2], pt.x, pt.y)
+        self.size += 1
+
+    def extend(self, tick, infector_id, infector_rank, infectee_id, infectee_rank, x, y):
+        # records many contacts at once, every argument being either a scalar or an array
+        columns = np.broadcast_arrays(tick, infector_id, infector_rank, infectee_id, infectee_rank, x, y)
+        start = 0
+        while start < len(columns[0]):
+            if self.size == len(self.buffer):
+                self.flush()
+            stop = min(len(columns[0]), start + len(self.buffer) - self.size)
+            block = self.buffer[self.size:self.size + stop - start]
+            for name, column in zip(ContactLog.DTYPE.names, columns):
+                block[name] = column[start:stop]
+            self.size += stop - start
+            start = stop
+
+    def flush(self):
+        with open(self.path, 'ab') as f:
+            self.buffer[:self.size].tofile(f)
+        self.size = 0
+
+
+def read_contacts(path):
+    """
+    Returns:
+        The contacts written by a ContactLog, as a read-only memory-mapped structured array.
+    """
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=ContactLog.DTYPE)
+    return np.memmap(path, dtype=ContactLog.DTYPE, mode='r')
+
+
+class ArrayModel:
+    """
+    Array-backed alternative to Model. The positions and the S/E/I/R states of
+    the walkers are held in NumPy arrays, so that a tick is a handful of
+    vectorized operations instead of a loop over Walker objects. Walkers move
+    with the same rule as Walker.walk (one diagonal step, sticky borders) and
+    get infected with the same rule as InfectionKernel, using the per-cell
+    counts of infected walkers as cell list. The model runs in a single
+    process, and walkers are identified by their index in the arrays.
+
+    Args:
+        params: the simulation input parameters
+        contacts: the ContactLog where infection contacts are recorded, if any
+    """
+
+    def __init__(self, params: Dict, S, E, I, R, contacts=None):
+        start = time.perf_counter()
+        S = int(S)
+        E = int(E)
+        I = int(I)
+        R = int(R)
+        self.width = params['world.width']
+        self.height = params['world.height']
+        self.stop_at = params['stop.at']
+        self.radius = params.get('infection.radius', 0)
+        self.probability = params.get('infection.probability', 1.0)
+        self.offsets = kernel_offsets(self.radius)
+        self.rng = random.default_rng
+        self.tick = 0
+        self.contacts = contacts
+
+        # positions and compartments of all the walkers, drawn in one go
+        n = S + E + I + R
+        self.x = self.rng.integers(0, self.width, size=n)
+        self.y = self.rng.integers(0, self.height, size=n)
+        self.state = np.repeat(np.arange(len(STATES), dtype=np.int8), [S, E, I, R])
+
+        # count the initial colocations at time 0
+        self.new_infected = 0
+        self.count_colocations()
+        self.setup_time = time.perf_counter() - start
+
+    def count_colocations(self):
+        # count the infected walkers of every cell, then, for each offset of the
+        # kernel, add up the counts of the cells around every susceptible walker
+        cell = self.x * self.height + self.y
+        infected = np.flatnonzero(self.state == STATES.index('I'))
+        infected_count = np.bincount(cell[infected], minlength=self.width * self.height)
+        susceptible = np.flatnonzero(self.state == STATES.index('S'))
+        contacts = np.zeros(len(susceptible), dtype=np.int64)
+        infector_cell = np.full(len(susceptible), -1)
+        for dx, dy in self.offsets:
+            x, y = self.x[susceptible] + dx, self.y[susceptible] + dy
+            inside = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+            neighbour = np.where(inside, x * self.height + y, 0)
+            found = np.where(inside, infected_count[neighbour], 0)
+            infector_cell = np.where((infector_cell < 0) & (found > 0), neighbour, infector_cell)
+            contacts += found
+        if self.probability >= 1:
+            infection = contacts > 0
+        else:
+            infection = self.rng.random(len(susceptible)) < 1 - (1 - self.probability) ** contacts
+        exposed = susceptible[infection]
+        self.state[exposed] = STATES.index('E')
+        self.new_infected += len(exposed)
+        if self.contacts is not None and len(exposed) > 0:
+            # one of the infected walkers of each cell is taken as the infector
+            infectors = np.zeros(self.width * self.height, dtype=np.int64)
+            infectors[cell[infected]] = infected
+            self.contacts.extend(self.tick, infectors[infector_cell[infection]], 0, exposed, 0, self.x[exposed], self.y[exposed])
+
+    def relabel(self, S, E, I, R):
+        """
+        Same as Model.relabel, on the state array.
+        """
+        counts = np.bincount(self.state, minlength=len(STATES))[None, :]
+        transitions = relabel_transitions(counts, S, E, I, R, self.rng)[0]
+        self.state = relabel_walkers(self.state, transitions, self.rng)
+        self.new_infected = 0
+        self.count_colocations()
+
+    def step(self):
+        self.tick += 1
+        xy_dirs = self.rng.choice(Walker.OFFSETS, size=(2, len(self.state)))
+        self.x = np.clip(self.x + xy_dirs[0], 0, self.width - 1)
+        self.y = np.clip(self.y + xy_dirs[1], 0, self.height - 1)
+        self.count_colocations()
+
+    def resume(self, ticks):
+        for _ in range(ticks):
+            self.step()
+        if self.contacts is not None:
+            self.contacts.flush()
 
     def start(self):
-        self.runner.execute()
+        self.resume(self.stop_at - self.tick)
+
+
+def local_share(count, rank, size):
+    """
+    Returns the part of ``count`` walkers assigned to ``rank`` when they are
+    partitioned as evenly as possible among ``size`` ranks.
+    """
+    return count // size + (1 if rank < count % size else 0)
+
+
+def relabel_transitions(counts, S, E, I, R, rng):
+    """
+    Splits the S/E/I/R counts of the director among the walkers of the ranks.
+    The walkers are given the labels in order of compartment, the most advanced
+    first, so that no walker goes back to an earlier compartment; the walkers of
+    a compartment that get each label are drawn at random among the ranks
+    (multivariate hypergeometric), so that every rank gets its share of the
+    promotions. The walkers left over when the counts add up to fewer walkers
+    are susceptible.
+
+    Args:
+        counts: (ranks, compartments) number of walkers of each rank in each compartment
+        rng: random generator, seeded in the same way on every rank
+
+    Returns:
+        (ranks, compartments, labels) number of walkers of each rank and compartment that get each label
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    ranks, n = counts.shape
+    advanced = np.arange(n)[::-1]                                  # R, I, E, S
+    # positions of the compartments and of the labels in the list of all the walkers, the most advanced first
+    block_end = np.cumsum(counts.sum(axis=0)[advanced])
+    block_start = block_end - counts.sum(axis=0)[advanced]
+    label_end = np.append(np.cumsum([int(R), int(I), int(E)]), max(block_end[-1], int(R) + int(I) + int(E)))
+    label_start = np.concatenate(([0], label_end[:-1]))
+    overlap = np.clip(np.minimum(block_end[:, None], label_end[None, :]) - np.maximum(block_start[:, None], label_start[None, :]), 0, None)
+    transitions = np.zeros((ranks, n, n), dtype=np.int64)
+    for c, compartment in enumerate(advanced):
+        remaining = counts[:, compartment].copy()
+        for l, label in enumerate(advanced):
+            if overlap[c, l] > 0:
+                drawn = rng.multivariate_hypergeometric(remaining, overlap[c, l])
+                transitions[:, compartment, label] = drawn
+                remaining -= drawn
+    return transitions
+
+
+def relabel_walkers(state, transitions, rng):
+    """
+    Returns the new labels of the walkers of a rank, whose compartments are in
+    ``state``: transitions[c, l] walkers of compartment c, picked at random,
+    get label l.
+    """
+    labels = state.copy()
+    for compartment in range(len(transitions)):
+        walkers = rng.permutation(np.flatnonzero(state == compartment))
+        labels[walkers] = np.repeat(np.arange(len(transitions), dtype=state.dtype), transitions[compartment])
+    return labels
 
 
 def run(params: Dict, S, E, I, R):
     model = Model(MPI.COMM_WORLD, params, S, E, I, R)
     model.start()
+    return model
 
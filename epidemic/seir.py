@@ -3,88 +3,154 @@ import sys
 import os
 import numpy as np
 from scipy.integrate import odeint
+from mpi4py import MPI
 from checkers import ConsistencyChecker, CallConditionsChecker
 from GEMMA_Interfaces import GEMMA_Component, GEMMA_Director
 from mobility_model import MobilityModel
+from surrogate import SurrogateMobilityModel
+from eir import EIR_model, EIR_propagator
     
 
-#unused here    
-def SEIR_model(state : tuple, time : np.ndarray, 
-               β : float, σ : float, γ : float) -> tuple:
-    S, E, I, R = state
-    δS = - β*I*S
-    δE = + β*I*S - σ*E
-    δI = + σ*E - γ*I
-    δR = + γ*I
-    return δS, δE, δI, δR 
-
-
-#like the SEIR model, but describing only transition from E to I and from I to R    
-def EIR_model(state : tuple, time : np.ndarray, 
-               σ : float, γ : float) -> tuple:
-    E, I, R = state
-    δE = - σ*E
-    δI = + σ*E - γ*I
-    δR = + γ*I
-    return δE, δI, δR 
-        
-
 class Launcher (GEMMA_Director):
 
-    def __init__ (self):#, sub_models):
+    def __init__ (self, σ=None, γ=None, resultFile="res.txt"):#, sub_models):
         super().__init__()
         self.σ, self.γ = 1, 0.1                        #σ = E --> I;  γ = I --> R
-        if len(sys.argv) > 2:
+        if σ is not None and γ is not None:
+            self.σ, self.γ = σ, γ
+        elif len(sys.argv) > 3:
             self.σ = float(sys.argv[2])
             self.γ = float(sys.argv[3])
-        self.resultFile = "res.txt"                #output file
-        if os.path.isfile(self.resultFile):
+        self.comm = MPI.COMM_WORLD                 #rank 0 runs the director and the ODE, every rank runs the mobility model
+        self.rank = self.comm.Get_rank()
+        self.resultFile = resultFile               #output file, None to keep the results in memory only
+        if self.rank == 0 and self.resultFile is not None and os.path.isfile(self.resultFile):
             os.remove (self.resultFile)
         self.resList = []
+        self.history = []                          #(S, E, I, R) at the end of every step
             
     
         
 
-    def instantiate_sub_models (self, *args):
-        self.sub_models ["mobility"] = MobilityModel()
+    def instantiate_sub_models (self, persistent_mobility=False, mobility_backend="repast", seed=None, surrogate_file=None, log_name=''):
+        self.sub_models ["mobility"] = MobilityModel(persistent=persistent_mobility, backend=mobility_backend, seed=seed, log_name=log_name)   #a persistent mobility model keeps its world across rounds
+        if surrogate_file is not None:                                                                                      #rounds already simulated many times are answered by a surrogate
+            self.sub_models ["mobility"] = SurrogateMobilityModel(self.sub_models ["mobility"], surrogate_file)
 
 
-    def setup(self, total_steps):
-        self.parameters["population_size"] = int(sys.argv[1])
+    def setup(self, total_steps, ode_solver="exact", population_size=None):
+        self.parameters["population_size"] = int(sys.argv[1]) if population_size is None else population_size
         self.parameters["initial_exposed"] = 10                  #individuals that are already exposed at the beginning of the simulation
         self.parameters ["duration"] = 0.15                         #duration of the continuous model execution
         self.parameters["total_steps"] = total_steps
+        self.parameters["ode_solver"] = ode_solver                  #"exact" applies the cached EIR propagator, "odeint" integrates the EIR model numerically
+        self.propagator = EIR_propagator(self.σ, self.γ, self.parameters["duration"])
         self.S, self.E, self.I, self.R = self.parameters["population_size"] - self.parameters["initial_exposed"], self.parameters["initial_exposed"], 0, 0  #initial number of individuals for each compartment
 
 
     def advance(self, dt):
+        if self.rank != 0:
+            self.serve_mobility()
+            return
         step = 0
         while ((self.E > 0 or self.I > 0) and step < self.parameters["total_steps"]):                                                     #repeat until epidemic is over or the assigned number of steps has been executed
             step+=1
             new_infected = -1   #reset at the beginning of the round
             if self.sub_models["mobility"].check_call_conditions(self, self.S, self.E, self.I) == True:         #if there are not susceptible people then it does not make sense to run the mobility-infection model
                 #os.system ("python3 mobility_model.py " + str (S) + " " + str (E) + " " + str(I) + " " + str(R))    #run the mobility model
-                self.sub_models["mobility"].setup(self.S, self.E, self.I, self.R)
-                self.sub_models["mobility"].advance()
-                with open('output.txt') as f:                                                                # read the number of new infected people
-                    new_infected = int(f.readline())
+                new_infected = self.run_mobility(self.S, self.E, self.I, self.R)                           # number of new infected people
 
                 self.S, self.E = self.sub_models["mobility"].check_consistency(self, new_infected, self.S, self.E)
 
-                
-            time = np.linspace(0, self.parameters["duration"], 1000)                       
-            state0 = (self.E, self.I, self.R)
 
-            res = odeint(EIR_model, y0=state0, t=time, args=(self.σ, self.γ))                                          #run EIR model
-            E_hat, I_hat, R_hat = zip(*res)
-            newE = int(E_hat[-1])
-            newI = int(I_hat[-1])
-            newR = int(R_hat[-1])
+            newE, newI, newR = self.solve_EIR()                                                                 #run EIR model
             
             self.S, self.E, self.I, self.R = self.check_consistency(self, self.parameters["population_size"], self.S, newE, newI, newR)
 
+            self.history.append((self.S, self.E, self.I, self.R))
             self.resList.append("at step " + str(step) + " S = " + str(self.S) + "; E = " + str(self.E) + "; I = " + str(self.I) + "; R = " + str(self.R) + "\n")
             print("Step " + str(step) + " has ended") 
+        self.comm.bcast(None, root=0)                                                                       #the other ranks can stop waiting for mobility rounds
+
+
+    def sweep(self, σ, γ, population_size=None, initial_exposed=None):
+        """
+        Runs the director for many (σ, γ) scenarios at once. The compartments of
+        all the scenarios are stacked in arrays and advanced together with the
+        exact EIR propagator and the batch consistency check; the mobility model
+        is only run for the scenarios whose call conditions hold. Scenarios in
+        which the epidemic is over keep their last state.
+
+        The scenarios share the mobility sub-model of the director, so with a
+        persistent mobility model they also share its world.
+
+        Args:
+            σ, γ: arrays (or scalars) of transition rates, one pair per scenario
+            population_size, initial_exposed: arrays (or scalars) overriding the values set in setup
+
+        Returns:
+            An array of shape (scenarios, total_steps, 4) with S, E, I, R at the end of every step.
+        """
+        if population_size is None:
+            population_size = self.parameters["population_size"]
+        if initial_exposed is None:
+            initial_exposed = self.parameters["initial_exposed"]
+        σ, γ, population_size, initial_exposed = (np.ravel(x) for x in np.broadcast_arrays(σ, γ, population_size, initial_exposed))
+        if self.rank != 0:
+            self.serve_mobility()
+            return None
+
+        propagator = EIR_propagator(σ, γ, self.parameters["duration"])
+        S, E = (population_size - initial_exposed).astype(np.int64), initial_exposed.astype(np.int64)
+        I, R = np.zeros_like(S), np.zeros_like(S)
+        results = np.zeros((len(S), self.parameters["total_steps"], 4), dtype=np.int64)
+        for step in range(self.parameters["total_steps"]):
+            active = (E > 0) | (I > 0)
+            if not active.any():
+                results[:, step:] = np.stack((S, E, I, R), axis=-1)[:, None]
+                break
+            for k in np.flatnonzero(active & self.checkCallConditionsMobilityBatch(self, S, E, I)):
+                new_infected = self.run_mobility(S[k], E[k], I[k], R[k])
+                S[k], E[k] = self.sub_models["mobility"].check_consistency(self, new_infected, S[k], E[k])
+
+            newE, newI, newR = np.einsum('nij,nj->in', propagator, np.stack((E, I, R), axis=-1)).astype(np.int64)
+            E, I, R = np.where(active, newE, E), np.where(active, newI, I), np.where(active, newR, R)
+            S, E, I, R = self.checkConsistencyODEBatch(self, population_size, S, E, I, R)
+            results[:, step] = np.stack((S, E, I, R), axis=-1)
+            print("Step " + str(step + 1) + " of the sweep has ended")
+        self.comm.bcast(None, root=0)
+        return results
+
+
+    def run_mobility(self, S, E, I, R, name="mobility"):
+        #run a round of the mobility sub-model called name, on every rank, and return the number of new infected
+        self.comm.bcast((name, (S, E, I, R)), root=0)                                                       #the other ranks join the mobility round
+        self.sub_models[name].setup(S, E, I, R)
+        return self.sub_models[name].advance().new_infected
+
+
+    def solve_EIR(self):
+        if self.parameters["ode_solver"] == "exact":
+            newE, newI, newR = self.propagator @ (self.E, self.I, self.R)
+            return int(newE), int(newI), int(newR)
+
+        time = np.linspace(0, self.parameters["duration"], 1000)                       
+        state0 = (self.E, self.I, self.R)
+
+        res = odeint(EIR_model, y0=state0, t=time, args=(self.σ, self.γ))
+        E_hat, I_hat, R_hat = zip(*res)
+        return int(E_hat[-1]), int(I_hat[-1]), int(R_hat[-1])
+
+
+    def serve_mobility(self):
+        #loop of the ranks other than 0: run the mobility rounds requested by the director until it broadcasts None
+        while True:
+            request = self.comm.bcast(None, root=0)
+            if request is None:
+                break
+            name, compartments = request
+            self.sub_models[name].setup(*compartments)
+            self.sub_models[name].advance()
 
 
     def check_consistency(self, checker, *args):
@@ -94,9 +160,15 @@ class Launcher (GEMMA_Director):
         pass        
 
     def retrieve_results (self, *args):
+        if self.rank != 0:
+            return
+        if isinstance(self.sub_models["mobility"], SurrogateMobilityModel):
+            self.sub_models["mobility"].save()
+        if self.resultFile is None:
+            return
         with open (self.resultFile, 'a') as r:                                                                 #output function: write epidemic progress at each step
             for elem in self.resList:
-                r.write(self.resList)
+                r.write(elem)
 
 
 if __name__ == "__main__":
@@ -107,4 +179,5 @@ if __name__ == "__main__":
     director.setup(total_steps)
     director.advance(total_steps)
     director.retrieve_results()
-    print ("Simulation Ended")
+    if director.rank == 0:
+        print ("Simulation Ended")
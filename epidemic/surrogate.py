@@ -0,0 +1,121 @@
+import os
+import numpy as np
+from GEMMA_Interfaces import GEMMA_Component
+from mobility_model import MobilityResult
+
+
+class BinnedSurrogate:
+    """
+    Cheap estimate of the number of new infected produced by a round of the
+    mobility model, learnt from the rounds actually simulated. The (S, E, I, R)
+    inputs are binned on a logarithmic scale, ``bins_per_octave`` bins every
+    time a compartment doubles, and every bin keeps count, mean and variance of
+    the new infected observed in it. A bin covers its inputs once it holds at
+    least ``min_samples`` samples and the standard error of its mean is within
+    ``tolerance`` times the mean (or within 1 infected for small means).
+
+    Args:
+        bins_per_octave: resolution of the bins
+        min_samples: minimum number of samples of a bin before it is used
+        tolerance: maximum relative standard error of the mean of a bin before it is used
+    """
+
+    def __init__(self, bins_per_octave=4, min_samples=5, tolerance=0.1):
+        self.bins_per_octave = bins_per_octave
+        self.min_samples = min_samples
+        self.tolerance = tolerance
+        self.bins = {}                              #bin --> [count, mean, sum of squared deviations]
+
+    def bin(self, compartments):
+        return tuple(int(np.floor(self.bins_per_octave * np.log2(1 + max(x, 0)))) for x in compartments)
+
+    def add(self, compartments, new_infected):
+        stats = self.bins.setdefault(self.bin(compartments), [0, 0.0, 0.0])
+        stats[0] += 1
+        delta = new_infected - stats[1]
+        stats[1] += delta / stats[0]
+        stats[2] += delta * (new_infected - stats[1])
+
+    def predict(self, compartments):
+        """
+        Returns:
+            The estimated number of new infected and the standard error of the estimate,
+            or None if the bin of the inputs has no samples.
+        """
+        stats = self.bins.get(self.bin(compartments))
+        if stats is None:
+            return None
+        count, mean, m2 = stats
+        stderr = np.sqrt(m2 / (count - 1) / count) if count > 1 else np.inf
+        return mean, stderr
+
+    def covers(self, compartments):
+        stats = self.bins.get(self.bin(compartments))
+        if stats is None or stats[0] < self.min_samples:
+            return False
+        mean, stderr = self.predict(compartments)
+        return stderr <= self.tolerance * max(mean, 1 / self.tolerance)
+
+    def save(self, path):
+        keys = np.array(list(self.bins.keys()), dtype=np.int64).reshape(-1, 4)
+        stats = np.array(list(self.bins.values()), dtype=float).reshape(-1, 3)
+        with open(path, 'wb') as f:
+            np.savez(f, keys=keys, stats=stats, settings=np.array([self.bins_per_octave, self.min_samples, self.tolerance]))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        bins_per_octave, min_samples, tolerance = data["settings"]
+        surrogate = cls(int(bins_per_octave), int(min_samples), float(tolerance))
+        surrogate.bins = {tuple(int(k) for k in key): [int(stats[0]), stats[1], stats[2]] for key, stats in zip(data["keys"], data["stats"])}
+        return surrogate
+
+
+class SurrogateMobilityModel(GEMMA_Component):
+    """
+    Multi-fidelity wrapper of a MobilityModel. A round is answered by the
+    surrogate when it covers the compartments received from the director,
+    otherwise the mobility model is run and its outcome becomes a new sample
+    of the surrogate. Since the outcome of the mobility model is the same on
+    every rank, all the ranks keep identical surrogates and take the same
+    decisions.
+
+    Args:
+        model: the MobilityModel to run when the surrogate does not cover the inputs
+        path: file of the surrogate, loaded if it exists and written by save
+    """
+
+    def __init__(self, model, path, **surrogate_options):
+        super().__init__()
+        self.model = model
+        self.path = path
+        self.surrogate = BinnedSurrogate.load(path) if os.path.isfile(path) else BinnedSurrogate(**surrogate_options)
+        self.parameters["surrogate_rounds"] = 0          #rounds answered by the surrogate
+        self.parameters["model_rounds"] = 0              #rounds answered by the mobility model
+
+    def setup (self, *args):
+        self.compartments = args
+
+    def advance(self, *args):
+        if self.surrogate.covers(self.compartments):
+            mean, stderr = self.surrogate.predict(self.compartments)
+            self.result = MobilityResult(new_infected=int(round(mean)), from_surrogate=True)
+            self.parameters["surrogate_rounds"] += 1
+        else:
+            self.model.setup(*self.compartments)
+            self.result = self.model.advance()
+            self.surrogate.add(self.compartments, self.result.new_infected)
+            self.parameters["model_rounds"] += 1
+        return self.retrieve_results()
+
+    def retrieve_results (self):
+        return self.result
+
+    def save(self):
+        self.surrogate.save(self.path)
+
+    def check_call_conditions (self, checker, *args):
+        return self.model.check_call_conditions(checker, *args)
+
+    def check_consistency(self, checker, *args):
+        return self.model.check_consistency(checker, *args)
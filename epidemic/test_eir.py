@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from scipy.integrate import odeint
+
+from eir import EIR_model, EIR_propagator
+
+
+DURATION = 0.15
+PAIRS = [
+    (1, 0.1),                  #defaults of the Launcher
+    (0.1, 1),
+    (0.5, 0.5),                #σ == γ
+    (0.5, 0.5 + 1e-9),         #σ ≈ γ, where the closed form cancels out
+    (0.5, 0.5 - 1e-6),
+    (0, 0.1),                  #no E --> I
+    (1, 0),                    #no I --> R
+    (0, 0),
+]
+
+
+@pytest.mark.parametrize("σ, γ", PAIRS)
+def test_propagator_matches_odeint(σ, γ):
+    y0 = np.array([10.0, 5.0, 2.0])
+    expected = odeint(EIR_model, y0, [0, DURATION], args=(σ, γ), rtol=1e-12, atol=1e-12)[-1]
+    np.testing.assert_allclose(EIR_propagator(σ, γ, DURATION) @ y0, expected, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("σ, γ", PAIRS)
+def test_propagator_preserves_population(σ, γ):
+    P = EIR_propagator(σ, γ, DURATION)
+    np.testing.assert_allclose(P.sum(axis=0), 1, atol=1e-12)
+    assert (P >= 0).all()
+
+
+def test_propagator_broadcasts_over_pairs():
+    σ, γ = np.array(PAIRS).T
+    P = EIR_propagator(σ, γ, DURATION)
+    assert P.shape == (len(PAIRS), 3, 3)
+    for k, pair in enumerate(PAIRS):
+        np.testing.assert_array_equal(P[k], EIR_propagator(*pair, DURATION))
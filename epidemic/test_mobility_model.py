@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("mpi4py")
+pytest.importorskip("repast4py")
+from mobility_model import STATES, ArrayModel, relabel_transitions, relabel_walkers
+
+
+S, E, I, R = range(len(STATES))
+
+
+def check_transitions(transitions, counts, targets):
+    #every walker gets a label, the labels add up to the counts of the director, and no walker goes back
+    np.testing.assert_array_equal(transitions.sum(axis=2), counts)
+    np.testing.assert_array_equal(transitions.sum(axis=(0, 1)), targets)
+    assert not np.tril(transitions.sum(axis=0), -1).any()
+
+
+def test_relabel_transitions_margins():
+    rng = np.random.default_rng(1)
+    counts = np.array([[500, 200, 100, 200], [400, 300, 150, 150]])
+    targets = [600, 250, 300, 850]
+    for _ in range(20):
+        check_transitions(relabel_transitions(counts, *targets, rng), counts, targets)
+
+
+def test_relabel_balances_promotions_across_ranks():
+    #every exposed and infected walker must move on: the promotions are split in proportion to the walkers of each rank
+    rng = np.random.default_rng(2)
+    counts = np.array([[1000, 100, 100, 0], [1000, 100, 100, 0]])
+    promoted = []
+    for _ in range(200):
+        transitions = relabel_transitions(counts, 2000, 0, 100, 300, rng)
+        check_transitions(transitions, counts, [2000, 0, 100, 300])
+        promoted.append(transitions[:, E, I])
+    promoted = np.array(promoted)
+    assert (promoted > 0).all()
+    np.testing.assert_allclose(promoted.mean(axis=0), [50, 50], rtol=0.05)
+
+
+def test_relabel_walkers_picks_at_random():
+    rng = np.random.default_rng(3)
+    state = np.repeat(np.arange(len(STATES), dtype=np.int8), [6, 4, 0, 0])
+    transitions = np.zeros((4, 4), dtype=np.int64)
+    transitions[S, S], transitions[E, E], transitions[E, I] = 6, 2, 2
+    promoted = np.zeros(len(state))
+    for _ in range(400):
+        labels = relabel_walkers(state, transitions, rng)
+        np.testing.assert_array_equal(labels[:6], S)
+        assert (labels == I).sum() == 2
+        promoted += labels == I
+    #every exposed walker has the same chance of being promoted, whatever its position
+    np.testing.assert_allclose(promoted[6:] / 400, 0.5, atol=0.1)
+
+
+def test_array_model_relabel():
+    params = {'world.width': 20, 'world.height': 20, 'stop.at': 5}
+    model = ArrayModel(params, 300, 50, 30, 20)
+    model.relabel(280, 40, 50, 30)
+    #the relabelled susceptible walkers may get exposed right away, the infected and recovered may not
+    assert len(model.state) == 400
+    assert (np.bincount(model.state, minlength=len(STATES))[[I, R]] == [50, 30]).all()
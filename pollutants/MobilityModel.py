@@ -1,20 +1,31 @@
 from GEMMA_Interfaces import GEMMA_Component
 from checkers import CallConditionsChecker, ConsistencyChecker
+from pollution_field import PollutionState
+from netlogo_daemon import NetLogoClient
 import pyNetLogo
 import os
 
 class MobilityModel(GEMMA_Component):
 
-	def __init__(self, modelPath, NetLogoPath, version):
-	    self.netlogo = pyNetLogo.NetLogoLink(gui=True, netlogo_home=NetLogoPath, netlogo_version=version)  # Linking with NetLogo
-	    self.netlogo.load_model(modelPath)    
+	def __init__(self, modelPath, NetLogoPath, version, gui=True, daemon=None):
+		super().__init__()
+		self.parameters["gui"] = gui                  #False runs NetLogo headless, e.g. on compute nodes without a display
+		self.parameters["daemon"] = daemon            #address of a NetLogoDaemon: its workspace, already loaded, is used instead of a new link
+		if daemon is not None:
+			self.netlogo = NetLogoClient(modelPath, daemon)
+			return
+		self.netlogo = pyNetLogo.NetLogoLink(gui=gui, netlogo_home=NetLogoPath, netlogo_version=version)  # Linking with NetLogo
+		self.netlogo.load_model(modelPath)    
 
 
 	def setup (self, population):
 		self.netlogo.command('setup ' + str(population))     #initialize the model, providing the overall number of vehicles
 
-	def advance(self):
-		self.netlogo.command('go')
+	def advance(self, n=1):
+		if n == 1:
+			self.netlogo.command('go')
+		elif n > 1:
+			self.netlogo.command('repeat ' + str(int(n)) + ' [ go ]')     #n ticks in a single call to NetLogo
 
 	def retrieve_results (self, *args):
 		 pass
@@ -26,10 +37,11 @@ class MobilityModel(GEMMA_Component):
 		pass
 
 	def getPollution (self):
-		#print (self.netlogo.report ("sum [ pollution ] of patches"))
-		#ab = int (self.netlogo.report ("sum [ pollution ] of patches"))
-		ab = self.netlogo.report ("sum [ pollution ] of patches")
-		return ab
+		return self.export_state().total()
+
+	def export_state (self):
+		#pollution field, positions and fuels of the cars, all in one call to NetLogo
+		return PollutionState.from_netlogo(self.netlogo.report ("export-state"))
 
 	def update_vehicles (self, petroil, GPL, electric ):
 		self.netlogo.command('update-vehicles ' + str(int(petroil)) + ' ' + str(int(GPL)) + ' ' + str(int(electric)) )	# update number of vehicles
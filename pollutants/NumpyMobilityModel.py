@@ -0,0 +1,92 @@
+from GEMMA_Interfaces import GEMMA_Component
+from checkers import CallConditionsChecker, ConsistencyChecker
+from pollution_field import PollutionState, PETROIL, GPL, ELECTRIC, TEMP
+import numpy as np
+from scipy import ndimage
+
+#diffuse pollution 0.4: every patch keeps 60% of its pollution and gives 5% to each of its 8 neighbours
+DIFFUSION_KERNEL = np.array([[0.05, 0.05, 0.05],
+                             [0.05, 0.60, 0.05],
+                             [0.05, 0.05, 0.05]])
+
+
+class NumpyMobilityModel(GEMMA_Component):
+	"""
+	Same dynamics as pollution.nlogo, with the same API as MobilityModel, without NetLogo.
+	The positions, headings and fuels of the cars are kept in arrays, and the pollution of the
+	patches in a (height, width) array indexed as [y, x]; the world wraps around in both directions.
+	Coordinates go from 0 to width (height) and the patch of a car is the integer part of its
+	coordinates, i.e. the NetLogo patch (pxcor, pycor) is the cell [pycor + 31, pxcor + 35] of the
+	default 71 x 63 world.
+	"""
+
+	def __init__(self, width=71, height=63, seed=None):
+		super().__init__()
+		self.parameters["width"] = width
+		self.parameters["height"] = height
+		self.rng = np.random.default_rng(seed)
+
+	def setup (self, population):
+		width, height = self.parameters["width"], self.parameters["height"]
+		self.pollution = np.full((height, width), 0.5)                  #initial pollution of every patch
+		self.x = self.rng.integers(0, width, population) + 0.5           #cars start at the centre of a random patch, with a random heading
+		self.y = self.rng.integers(0, height, population) + 0.5
+		self.heading = self.rng.integers(0, 360, population).astype(float)
+		self.fuel = np.full(population, PETROIL, dtype=np.int8)
+		self.totals = np.array([population, 0, 0])                       #petroil-total, GPL-total, electric-total
+
+	def advance(self, n=1):
+		for _ in range(n):
+			self.step()
+
+	def step(self):
+		width, height = self.parameters["width"], self.parameters["height"]
+		#wander: rt random-float 50, lt random-float 50, fd 1 (heading 0 is north, clockwise)
+		self.heading = (self.heading + self.rng.uniform(0, 50, len(self.heading)) - self.rng.uniform(0, 50, len(self.heading))) % 360
+		radians = np.deg2rad(self.heading)
+		self.x = (self.x + np.sin(radians)) % width
+		self.y = (self.y + np.cos(radians)) % height
+
+		cells = self.cells()
+		for fuel, emission in ((PETROIL, 1.2), (GPL, 0.6)):             #a patch gains the emission of a fuel if any car with that fuel is on it
+			occupied = np.bincount(cells[self.fuel == fuel], minlength=self.pollution.size) > 0
+			self.pollution += emission * occupied.reshape(self.pollution.shape)
+		self.pollution += 0.00008 * self.totals[ELECTRIC] - 0.02
+		np.maximum(self.pollution, 0, out=self.pollution)
+		self.pollution = ndimage.convolve(self.pollution, DIFFUSION_KERNEL, mode='wrap')
+
+	def cells(self):
+		#flat index of the patch of every car
+		rows, columns = PollutionState(self.pollution, self.x, self.y, self.fuel).cells()
+		return rows * self.parameters["width"] + columns
+
+	def retrieve_results (self, *args):
+		 pass
+
+	def check_call_conditions (self, checker):
+		pass
+
+	def check_consistency(self, checker):
+		pass
+
+	def getPollution (self):
+		return self.export_state().total()
+
+	def export_state (self):
+		return PollutionState(pollution=self.pollution.copy(), x=self.x.copy(), y=self.y.copy(), fuel=self.fuel.copy())
+
+	def update_vehicles (self, petroil, GPL_count, electric ):
+		#same as the update-vehicles procedure: the cars in excess become "temp", and the missing ones are taken from the "temp" cars
+		targets = np.array([int(petroil), int(GPL_count), int(electric)])
+		diff = targets - self.totals
+		for fuel in (PETROIL, GPL):
+			if diff[fuel] < 0:
+				self.change_fuel(fuel, TEMP, -diff[fuel])
+		for fuel in (GPL, ELECTRIC):
+			if diff[fuel] > 0:
+				self.change_fuel(TEMP, fuel, diff[fuel])
+		self.totals = targets
+
+	def change_fuel(self, old, new, count):
+		candidates = np.flatnonzero(self.fuel == old)
+		self.fuel[self.rng.choice(candidates, count, replace=False)] = new
@@ -7,6 +7,8 @@ class CallConditionsChecker():
 	def checkCallConditionsODE (self, submodel, *args):		#the ODE model is called every update_frequency steps
 
 		step, update_step = args
+		if self.parameters.get("schedule") == "adaptive":		#or, with the adaptive schedule, at the step chosen by scheduleCouplingODE
+			return step >= self.parameters["next_coupling"]
 		if step % self.parameters["update_frequency"] == update_step:
 			return True
 		else:
@@ -14,6 +16,23 @@ class CallConditionsChecker():
 
 
 
+	def scheduleCouplingODE (self, step, pollution):		#adaptive schedule: choose the next call of the ODE model from the change of pollution since the previous call
+		last = self.parameters.get("last_coupling")
+		interval = self.parameters["update_frequency"]		#first interval, before any change of pollution is known
+		rate = None
+		if last is not None:
+			last_step, last_pollution, last_interval = last
+			rate = abs(pollution - last_pollution) / max(abs(last_pollution), 1e-9) / max(step - last_step, 1)		#relative change of pollution per step
+			interval = self.parameters["tolerance"] / rate if rate > 0 else self.parameters["max_interval"]		#steps for a relative change of tolerance
+			interval = min(interval, 2 * last_interval)		#grow at most twice per call, the rate may be about to change
+		interval = int(min(max(interval, self.parameters["min_interval"]), self.parameters["max_interval"]))
+		self.parameters["last_coupling"] = (step, pollution, interval)
+		self.parameters["next_coupling"] = step + interval
+		self.coupling_log.append((step, pollution, rate, interval))
+		return interval
+
+
+
 class ConsistencyChecker ():
 
 	def checkConsistencyMobility (self,  submodel, *args):
@@ -4,8 +4,10 @@ from scipy import stats
 import os
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from GEMMA_Interfaces import GEMMA_Component, GEMMA_Director
-from MobilityModel import MobilityModel
+from NumpyMobilityModel import NumpyMobilityModel
+from pollution_field import FieldRecorder
 from ode_model import ODEModel
 from checkers import ConsistencyChecker, CallConditionsChecker
 
@@ -21,31 +23,90 @@ class Launcher (GEMMA_Director):
         self.parameters["GPL"] = 0
         self.parameters["electric"] = 0
 
-    def instantiate_sub_models (self, *args):
-        modelPath, NetLogoPath, version = args
-        mobilityModel = MobilityModel(modelPath, NetLogoPath, version)
+    def instantiate_sub_models (self, *args, gui=True, backend="netlogo", seed=None, mobility=None, daemon=None):
+        if mobility is not None:                                     #a mobility model already loaded, reused with a new setup
+            mobilityModel = mobility
+        elif backend == "numpy":                                     #same dynamics as the NetLogo model, without NetLogo
+            mobilityModel = NumpyMobilityModel(seed=seed)
+        else:
+            from MobilityModel import MobilityModel                   #imported here, so that the numpy backend does not need pyNetLogo
+            modelPath, NetLogoPath, version = args
+            mobilityModel = MobilityModel(modelPath, NetLogoPath, version, gui=gui, daemon=daemon)
         ode_model = ODEModel()
         self.sub_models ["mobility"] = mobilityModel
         self.sub_models ["ode"] = ode_model
 
-    def setup(self):
+    def setup(self, coupling="synchronous", schedule="fixed", min_interval=10, max_interval=300, tolerance=0.05, record_every=None):
         self.pollution_over_time=[]
         self.resultFile = "res.txt"
+        #"fixed": the compartmental model is called every update_frequency steps.
+        #"adaptive": after every call, the next one is scheduled so that pollution changes by about tolerance (relative) in between,
+        #at the rate of change observed since the previous call, within min_interval and max_interval steps; every call of the
+        #compartmental model covers the steps elapsed since the previous one (update_frequency steps being its unit of time)
+        self.parameters["schedule"] = schedule
+        self.parameters["min_interval"] = min_interval
+        self.parameters["max_interval"] = max_interval
+        self.parameters["tolerance"] = tolerance
+        self.parameters["next_coupling"] = 10 % self.parameters["update_frequency"]      #first call at the same step as with the fixed schedule
+        self.parameters["last_coupling"] = None
+        self.coupling_log = []                        #(step, pollution, relative change per step, interval to the next call) of every call, adaptive schedule
+        self.couplingLogFile = "coupling_log.txt"
+        #"synchronous": at every coupling the mobility model waits for the compartmental model and gets the new vehicles at once.
+        #"pipelined": the compartmental model of a coupling runs on a worker thread while the mobility model runs the ticks
+        #up to the next coupling, where the new vehicles are applied: the vehicles change one update interval late
+        self.parameters["coupling"] = coupling
+        #if not None, the pollution field is recorded every record_every ticks in recordFile, memory-mapped (see FieldRecorder)
+        self.parameters["record_every"] = record_every
+        self.recordFile = "pollution_field.npy"
 
     def advance(self, dt):
         self.sub_models["mobility"].setup(self.parameters["population"])
+        pipeline = ThreadPoolExecutor(max_workers=1) if self.parameters["coupling"] == "pipelined" else None
+        running = None                                # compartmental model of the previous coupling, in pipelined mode
+        recorder = None if self.parameters["record_every"] is None else FieldRecorder(self.recordFile, dt // self.parameters["record_every"])
+        pending = 0                                   #ticks not yet run by the mobility model: they are run all together before the next coupling or frame
         for i in range (dt):
-            self.sub_models["mobility"].advance()     
-            if  self.sub_models["ode"].check_call_conditions(self, i, 10) == True: #director.check_call_conditions (director.check_call_conditions_ODE, i, 10) == True:
-                pollution =  self.sub_models["mobility"].getPollution()
+            pending += 1
+            record = recorder is not None and (i + 1) % self.parameters["record_every"] == 0
+            call = self.sub_models["ode"].check_call_conditions(self, i, 10 % self.parameters["update_frequency"]) == True #director.check_call_conditions (director.check_call_conditions_ODE, i, 10) == True:
+            if record or call:
+                self.sub_models["mobility"].advance(pending)
+                pending = 0
+                self.state = self.sub_models["mobility"].export_state()          #pollution field and cars, in a single call
+            if record:
+                recorder.record(i + 1, self.state)                               #i + 1 ticks have been run
+            if call:
+                pollution = self.state.total()
                 print ("pollution: " + str(pollution))
                 self.pollution_over_time.append(pollution)
-                petroil, GPL, electric = self.sub_models["ode"].advance(self.parameters["petroil"], self.parameters["GPL"], self.parameters["electric"], pollution/10000)    # compartmental model launched     
-                print ("at ", i, " petroil: ", petroil, " GPL: ", GPL, " electric: ", electric)
-                self.parameters["petroil"], self.parameters["GPL"], self.parameters["electric"] = self.sub_models["ode"].check_consistency(self, petroil, GPL, electric)         
-                #print ("after--> petroil: ", petroil, " GPL: ", GPL, " electric: ", electric)                        
-                self.sub_models["mobility"].update_vehicles(self.parameters["petroil"], self.parameters["GPL"], self.parameters["electric"])  # update number of vehicles
-                #print (str(int(petroil)) + ' ' + str(int(GPL)) + ' ' + str(int(electric)))
+                duration = 1                                                     #time covered by the compartmental model, in update intervals
+                if self.parameters["schedule"] == "adaptive":
+                    if self.parameters["last_coupling"] is not None:
+                        duration = (i - self.parameters["last_coupling"][0]) / self.parameters["update_frequency"]
+                    self.scheduleCouplingODE(i, pollution)
+                if pipeline is None:
+                    self.update_vehicles(self.couple(i, self.parameters["petroil"], self.parameters["GPL"], self.parameters["electric"], pollution, duration))
+                    continue
+                if running is not None:
+                    self.update_vehicles(running.result())                      #vehicles computed at the previous coupling
+                running = pipeline.submit(self.couple, i, self.parameters["petroil"], self.parameters["GPL"], self.parameters["electric"], pollution, duration)
+        if running is not None:
+            self.update_vehicles(running.result())
+        if pipeline is not None:
+            pipeline.shutdown()
+        self.sub_models["mobility"].advance(pending)      #ticks after the last coupling
+        if recorder is not None:
+            recorder.close()
+
+    def couple(self, i, petroil, GPL, electric, pollution, duration=1):
+        #run the compartmental model from the given vehicles and pollution, and return the new (consistent) number of vehicles per fuel
+        petroil, GPL, electric = self.sub_models["ode"].advance(petroil, GPL, electric, pollution/10000, duration)    # compartmental model launched     
+        print ("at ", i, " petroil: ", petroil, " GPL: ", GPL, " electric: ", electric)
+        return self.sub_models["ode"].check_consistency(self, petroil, GPL, electric)
+
+    def update_vehicles(self, vehicles):
+        self.parameters["petroil"], self.parameters["GPL"], self.parameters["electric"] = vehicles
+        self.sub_models["mobility"].update_vehicles(self.parameters["petroil"], self.parameters["GPL"], self.parameters["electric"])  # update number of vehicles
      
 
 
@@ -58,24 +119,38 @@ class Launcher (GEMMA_Director):
     def retrieve_results (self):
         with open (self.resultFile, "w") as file:
             for index, elem in enumerate (self.pollution_over_time):
-                file.write ("At timestep " + str(index * self.parameters["update_frequency"]) + " pollution: " + str(elem))
+                timestep = self.coupling_log[index][0] if self.parameters["schedule"] == "adaptive" else index * self.parameters["update_frequency"]
+                file.write ("At timestep " + str(timestep) + " pollution: " + str(elem) + "\n")
+        if self.parameters["schedule"] == "adaptive":
+            with open (self.couplingLogFile, "w") as file:                 #one line per call of the compartmental model
+                file.write ("step,pollution,change_rate,next_interval\n")
+                for step, pollution, rate, interval in self.coupling_log:
+                    file.write (str(step) + "," + str(pollution) + "," + ("" if rate is None else str(rate)) + "," + str(interval) + "\n")
 
 
 
 ############################################################################################################################################
 
 
-NetLogoPath = '/home/luca/Downloads/NetLogo/'
-modelPath = '/home/luca/Documents/gemma/pollutants/pollution.nlogo'
-steps = 3000
-update_frequency=30
-population = 200
+if __name__ == "__main__":
 
-director = Launcher([update_frequency, population])
-director.setup()
-director.instantiate_sub_models (modelPath, NetLogoPath, '6.0')
+    NetLogoPath = '/home/luca/Downloads/NetLogo/'
+    modelPath = '/home/luca/Documents/gemma/pollutants/pollution.nlogo'
+    steps = 3000
+    update_frequency=30
+    population = 200
+    gui = True                 #False to run NetLogo headless
+    backend = "netlogo"        #"numpy" to run the mobility model without NetLogo
+    coupling = "synchronous"   #"pipelined" to run the compartmental model while NetLogo runs the next ticks
+    schedule = "fixed"         #"adaptive" to call the compartmental model more often when pollution changes fast
+    record_every = None        #e.g. 10 to record the pollution field every 10 ticks in pollution_field.npy
+    daemon = None              #e.g. ("localhost", 6000) to use a workspace of a running netlogo_daemon.py, whose key is read from its key file
 
-director.advance(steps)
-director.retrieve_results()
-print ("Simulation Ended")
+    director = Launcher([update_frequency, population])
+    director.setup(coupling, schedule, record_every=record_every)
+    director.instantiate_sub_models (modelPath, NetLogoPath, '6.0', gui=gui, backend=backend, daemon=daemon)
+
+    director.advance(steps)
+    director.retrieve_results()
+    print ("Simulation Ended")
 
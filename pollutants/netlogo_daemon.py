@@ -0,0 +1,140 @@
+#!/bin/python3
+import os
+import sys
+import secrets
+import threading
+from multiprocessing.connection import Listener, Client
+
+ADDRESS = ("localhost", 6000)
+#file holding the key of the running daemon, readable only by its owner
+KEY_FILE = os.environ.get("GEMMA_NETLOGO_KEY_FILE", os.path.join(os.path.expanduser("~"), ".gemma_netlogo_key"))
+
+
+def write_authkey(path=KEY_FILE):
+	#new random key, written to a file created from scratch with mode 0600 (O_EXCL does not follow a planted symlink)
+	authkey = secrets.token_bytes(32)
+	if os.path.lexists(path):
+		os.remove(path)
+	fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+	with os.fdopen(fd, "wb") as f:
+		f.write(authkey)
+	return authkey
+
+
+def read_authkey(path=KEY_FILE):
+	with open(path, "rb") as f:
+		return f.read()
+
+
+class NetLogoDaemon:
+	"""
+	Long-lived process keeping headless NetLogo workspaces loaded, so that the JVM is started and every
+	model is loaded only once for many runs of the launcher. Every client attaches to a model and gets a
+	workspace of its own, with the model already loaded, which goes back to the pool when the client
+	detaches; the clients are served by one thread each, and send the same command and report requests
+	that MobilityModel sends to pyNetLogo (setup, go, update-vehicles, export-state, ...).
+
+	The connections are not encrypted and every message is unpickled, so only the clients knowing the key
+	may connect: a random key is drawn every time the daemon starts and written to key_file, which only
+	the user running the daemon can read.
+
+	Args:
+		NetLogoPath, version: NetLogo installation, as for MobilityModel
+		address: local socket of the daemon
+		key_file: file where the key required to connect is written
+	"""
+
+	def __init__(self, NetLogoPath, version, address=ADDRESS, key_file=KEY_FILE):
+		self.NetLogoPath = NetLogoPath
+		self.version = version
+		self.address = address
+		self.key_file = key_file
+		self.free = {}                     #model path --> workspaces with the model loaded and no client attached
+		self.lock = threading.Lock()
+
+	def serve_forever(self):
+		with Listener(self.address, authkey=write_authkey(self.key_file)) as listener:
+			while True:
+				connection = listener.accept()
+				threading.Thread(target=self.serve, args=(connection,), daemon=True).start()
+
+	def checkout(self, modelPath):
+		with self.lock:
+			if self.free.get(modelPath):
+				return self.free[modelPath].pop()
+		import pyNetLogo
+		workspace = pyNetLogo.NetLogoLink(gui=False, netlogo_home=self.NetLogoPath, netlogo_version=self.version)
+		workspace.load_model(modelPath)
+		return workspace
+
+	def checkin(self, modelPath, workspace):
+		with self.lock:
+			self.free.setdefault(modelPath, []).append(workspace)
+
+	def serve(self, connection):
+		#requests are (operation, argument) pairs: ("attach", model path), ("command", text), ("report", reporter), ("detach", None);
+		#every request is answered with ("ok", result) or ("error", message)
+		modelPath, workspace = None, None
+		with connection:
+			while True:
+				try:
+					operation, argument = connection.recv()
+				except EOFError:
+					break
+				try:
+					if operation == "attach":
+						modelPath, workspace = argument, self.checkout(argument)
+						result = None
+					elif operation == "command":
+						result = workspace.command(argument)
+					elif operation == "report":
+						result = workspace.report(argument)
+					elif operation == "detach":
+						connection.send(("ok", None))
+						break
+					else:
+						raise ValueError("unknown operation " + str(operation))
+					connection.send(("ok", result))
+				except Exception as e:
+					connection.send(("error", repr(e)))
+		if workspace is not None:
+			self.checkin(modelPath, workspace)
+
+
+class NetLogoClient:
+	"""
+	Connection to a NetLogoDaemon, with the command and report methods of a pyNetLogo link, so that
+	MobilityModel can use a workspace of the daemon in place of its own link. The key is read from the
+	key file of the daemon.
+	"""
+
+	def __init__(self, modelPath, address=ADDRESS, key_file=KEY_FILE):
+		self.connection = Client(tuple(address), authkey=read_authkey(key_file))
+		self.request("attach", modelPath)
+
+	def request(self, operation, argument=None):
+		self.connection.send((operation, argument))
+		status, result = self.connection.recv()
+		if status == "error":
+			raise RuntimeError("NetLogo daemon: " + result)
+		return result
+
+	def command(self, text):
+		return self.request("command", text)
+
+	def report(self, reporter):
+		return self.request("report", reporter)
+
+	def kill_workspace(self):
+		#same name as in pyNetLogo: the workspace is not killed, it goes back to the daemon for the next client
+		self.request("detach")
+		self.connection.close()
+
+
+if __name__ == "__main__":
+
+	NetLogoPath = sys.argv[1]
+	version = sys.argv[2] if len(sys.argv) > 2 else '6.0'
+	port = int(sys.argv[3]) if len(sys.argv) > 3 else ADDRESS[1]
+	print ("NetLogo daemon listening on port " + str(port) + ", key in " + KEY_FILE)
+	NetLogoDaemon(NetLogoPath, version, ("localhost", port)).serve_forever()
@@ -25,14 +25,39 @@ class ODEModel(GEMMA_Component):
 		pass
 
 
-	def advance (self, petroil, GPL, electric, incentive): 
-		time = np.linspace(0, 1, 1000)
+	def advance (self, petroil, GPL, electric, incentive, duration=1): 
+		time = np.linspace(0, duration, 1000)
 		state0 = (petroil, GPL, electric)
 		β, σ, γ = 0.1 * incentive, 0.08 * incentive, 0.02 * incentive	
 		res = odeint(self.pollution_model, y0=state0, t=time, args=(β, σ, γ))
 
 		return self.retrieve_results(res)
 
+	def advance_batch (self, states, incentives, t=1):
+		#same as advance for many scenarios at once: states is an array of shape (scenarios, 3) with petroil, GPL, electric,
+		#incentives an array of shape (scenarios,) or a single incentive for all of them; the model is linear, so the terminal states are P @ state, with P computed in closed form
+		states = np.asarray(states, dtype=float)
+		P = self.propagator(np.broadcast_to(np.asarray(incentives, dtype=float), len(states)), t)
+		return np.einsum('nij,nj->ni', P, states).astype(np.int64)      #truncated as in retrieve_results
+
+	def propagator (self, incentive, t):
+		#exact solution of pollution_model after a time t, one 3x3 matrix per incentive
+		β, σ, γ = 0.1 * incentive, 0.08 * incentive, 0.02 * incentive
+		a = β + σ                                                        #rate at which petroil vehicles are converted
+		ea, eγ = np.exp(-a*t), np.exp(-γ*t)
+		#fraction of petroil that is GPL at time t: β*(ea - eγ)/(γ - a), written as β*t*exp(-min(a, γ)*t)*(1 - exp(-x))/x with x = |γ - a|*t
+		x = np.abs(γ - a)*t
+		ratio = np.where(x > 0, -np.expm1(-x)/np.where(x > 0, x, 1), 1)
+		δPG = β*t*np.exp(-np.minimum(a, γ)*t)*ratio
+		P = np.zeros(np.shape(incentive) + (3, 3))
+		P[..., 0, 0] = ea
+		P[..., 1, 0] = δPG
+		P[..., 2, 0] = 1 - ea - δPG
+		P[..., 1, 1] = eγ
+		P[..., 2, 1] = 1 - eγ
+		P[..., 2, 2] = 1
+		return P
+
 	def retrieve_results(self, res):
 		petroil_hat, GPL_hat, electric_hat = zip(*res)
 		total_petroil = petroil_hat[-1]
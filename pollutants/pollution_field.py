@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+import numpy as np
+
+PETROIL, GPL, ELECTRIC, TEMP = 0, 1, 2, 3                 #fuel codes of the cars
+FUELS = ("petroil", "GPL", "electric", "temp")            #names of the fuels in pollution.nlogo, in the order of the codes
+
+
+@dataclass
+class PollutionState:
+	"""
+	Snapshot of the mobility model, exported in a single call.
+	pollution is a (height, width) array indexed as [y, x], with y = 0 the bottom row of the world;
+	x and y are the coordinates of the cars from the bottom-left corner of the world, in patches,
+	so that the patch of a car is [int(y), int(x)]; fuel holds the fuel codes of the cars.
+	"""
+	pollution: np.ndarray
+	x: np.ndarray
+	y: np.ndarray
+	fuel: np.ndarray
+
+	def total(self):
+		return self.pollution.sum()
+
+	def fuel_counts(self):
+		#number of cars of every fuel, indexed by fuel code
+		return np.bincount(self.fuel, minlength=len(FUELS))
+
+	def cells(self):
+		#patch of every car, as (row, column) indices of the pollution array
+		height, width = self.pollution.shape
+		return np.minimum(self.y.astype(np.int64), height - 1), np.minimum(self.x.astype(np.int64), width - 1)
+
+	def exposure(self, fuel=None):
+		#pollution of the patch of every car (of the given fuel)
+		rows, columns = self.cells()
+		exposure = self.pollution[rows, columns]
+		return exposure if fuel is None else exposure[self.fuel == fuel]
+
+	@classmethod
+	def from_netlogo(cls, values):
+		"""
+		Builds the state from the flat list reported by export-state in pollution.nlogo:
+		world-width, world-height, min-pxcor, min-pycor, number of cars, the pollution of the patches
+		(sorted from left to right and from top to bottom), then xcor, ycor and fuel code of every car.
+		"""
+		values = np.asarray(values, dtype=float)
+		width, height, min_pxcor, min_pycor, cars = values[:5].astype(np.int64)
+		patches = values[5:5 + width * height]
+		xcor, ycor, fuel = values[5 + width * height:].reshape(3, cars)
+		return cls(pollution=patches.reshape(height, width)[::-1].copy(),
+			x=xcor - min_pxcor + 0.5, y=ycor - min_pycor + 0.5, fuel=fuel.astype(np.int8))
+
+
+class FieldRecorder:
+	"""
+	Records the pollution field of the mobility model in a .npy file memory-mapped on disk, preallocated
+	with shape (frames, height, width), so that long runs are never held in memory. A second .npy file
+	(same name, ending with _meta.npy) holds for every frame the tick and the number of cars per fuel;
+	the frames that are not recorded keep tick -1. Both files can be opened lazily with open_recording.
+
+	Args:
+		path: .npy file of the field
+		frames: number of frames to allocate
+		dtype: type of the recorded pollution values
+	"""
+
+	META_DTYPE = np.dtype([("tick", np.int64), ("petroil", np.int32), ("GPL", np.int32), ("electric", np.int32)])
+
+	def __init__(self, path, frames, dtype=np.float32):
+		self.path = path
+		self.frames = frames
+		self.dtype = dtype
+		self.count = 0
+		self.field = None                      #allocated at the first frame, when the size of the world is known
+
+	def record(self, tick, state):
+		if self.count >= self.frames:
+			return
+		if self.field is None:
+			self.field = np.lib.format.open_memmap(self.path, mode="w+", dtype=self.dtype, shape=(self.frames,) + state.pollution.shape)
+			self.meta = np.lib.format.open_memmap(meta_path(self.path), mode="w+", dtype=self.META_DTYPE, shape=(self.frames,))
+			self.meta["tick"] = -1
+		self.field[self.count] = state.pollution
+		counts = state.fuel_counts()
+		self.meta[self.count] = (tick, counts[PETROIL], counts[GPL], counts[ELECTRIC])
+		self.count += 1
+
+	def close(self):
+		if self.field is not None:
+			self.field.flush()
+			self.meta.flush()
+			self.field, self.meta = None, None
+
+
+def meta_path(path):
+	return path[:-len(".npy")] + "_meta.npy" if path.endswith(".npy") else path + "_meta.npy"
+
+
+def open_recording(path):
+	#field (frames, height, width) and metadata of a recording, memory-mapped read-only: frames are read from disk only when accessed
+	return np.load(path, mmap_mode="r"), np.load(meta_path(path), mmap_mode="r")
@@ -0,0 +1,64 @@
+#!/bin/python3
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from launcher import Launcher
+
+mobility = None             #mobility model of the worker process, loaded once and reused by all its scenarios
+
+
+def init_worker(backend, model_args, seed):
+    #load the mobility model of the worker: for NetLogo, a headless workspace with the model already loaded
+    global mobility
+    director = Launcher([1, 0])
+    director.instantiate_sub_models(*model_args, gui=False, backend=backend, seed=seed)
+    mobility = director.sub_models["mobility"]
+
+
+def run_scenario(population, update_frequency, steps):
+    #run the whole coupled model for one scenario, on the mobility model of the worker, and return its pollution time series
+    director = Launcher([update_frequency, population])
+    director.setup()
+    director.instantiate_sub_models(mobility=mobility)
+    director.advance(steps)
+    return director.pollution_over_time
+
+
+def run_sweep(populations, update_frequencies, steps, processes=None, backend="netlogo", model_args=(), seed=None):
+    """
+    Runs the coupled model for every (population, update_frequency) pair on a pool of
+    ``processes`` worker processes. Every worker loads its own mobility model once, e.g.
+    a headless NetLogo workspace, and reuses it (with setup) for all the scenarios it takes
+    from the queue of the pool.
+
+    Args:
+        model_args: path of the .nlogo model, path of NetLogo and NetLogo version, for the netlogo backend
+
+    Yields:
+        (population, update_frequency, pollution time series) for every scenario, as soon as it ends.
+    """
+    context = multiprocessing.get_context("spawn")          #a JVM must not be forked
+    with ProcessPoolExecutor(processes, mp_context=context, initializer=init_worker, initargs=(backend, model_args, seed)) as pool:
+        futures = {pool.submit(run_scenario, population, update_frequency, steps): (population, update_frequency)
+                   for population, update_frequency in itertools.product(populations, update_frequencies)}
+        for future in as_completed(futures):
+            population, update_frequency = futures[future]
+            yield population, update_frequency, future.result()
+
+
+if __name__ == "__main__":
+
+    NetLogoPath = '/home/luca/Downloads/NetLogo/'
+    modelPath = '/home/luca/Documents/gemma/pollutants/pollution.nlogo'
+    steps = 3000
+    populations = [100, 200, 400]
+    update_frequencies = [10, 30, 100]
+    processes = 4
+    resultFile = "sweep_res.txt"
+
+    with open (resultFile, "w") as file:
+        for population, update_frequency, pollution in run_sweep(populations, update_frequencies, steps, processes, model_args=(modelPath, NetLogoPath, '6.0')):
+            file.write ("population: " + str(population) + " update_frequency: " + str(update_frequency) + " pollution: " + " ".join(str(p) for p in pollution) + "\n")
+            file.flush()                                    #results are written as the scenarios end
+            print ("Scenario with population " + str(population) + " and update frequency " + str(update_frequency) + " ended")
+    print ("Sweep Ended")
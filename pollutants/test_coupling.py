@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from launcher import Launcher
+
+
+SEED = 7
+STEPS = 600
+UPDATE_FREQUENCY = 30
+POPULATION = 200
+
+
+class RecordingLauncher(Launcher):
+	#keeps the vehicles returned by every coupling and the vehicles applied to the mobility model, with the coupling they are applied at
+	def setup(self, *args, **kwargs):
+		super().setup(*args, **kwargs)
+		self.produced, self.applied = [], []
+
+	def couple(self, *args, **kwargs):
+		vehicles = super().couple(*args, **kwargs)
+		self.produced.append(tuple(vehicles))
+		return vehicles
+
+	def update_vehicles(self, vehicles):
+		self.applied.append((len(self.pollution_over_time) - 1, tuple(vehicles)))
+		super().update_vehicles(vehicles)
+
+
+def run(coupling):
+	director = RecordingLauncher([UPDATE_FREQUENCY, POPULATION])
+	director.setup(coupling)
+	director.instantiate_sub_models(backend="numpy", seed=SEED)
+	director.advance(STEPS)
+	return director
+
+
+@pytest.fixture(scope="module")
+def runs():
+	return {coupling: run(coupling) for coupling in ("synchronous", "pipelined")}
+
+
+def test_same_number_of_couplings(runs):
+	assert len(runs["synchronous"].pollution_over_time) == len(runs["pipelined"].pollution_over_time) == STEPS // UPDATE_FREQUENCY
+
+
+def test_first_coupling_is_the_same(runs):
+	#no vehicles have been changed yet, and both models use the same random stream
+	assert runs["pipelined"].pollution_over_time[0] == runs["synchronous"].pollution_over_time[0]
+	assert runs["pipelined"].produced[0] == runs["synchronous"].produced[0]
+
+
+def test_synchronous_applies_the_vehicles_at_once(runs):
+	director = runs["synchronous"]
+	assert director.applied == list(enumerate(director.produced))
+
+
+def test_pipelined_applies_the_vehicles_one_coupling_late(runs):
+	director = runs["pipelined"]
+	couplings = len(director.pollution_over_time)
+	assert len(director.produced) == len(director.applied) == couplings
+	#the mix applied at coupling k is the one computed at coupling k - 1; the last one is applied after the last coupling
+	for k, (coupling, vehicles) in enumerate(director.applied[:-1], start=1):
+		assert coupling == k
+		assert vehicles == director.produced[k - 1]
+	assert director.applied[-1] == (couplings - 1, director.produced[-1])
+	final = director.sub_models["mobility"].export_state().fuel_counts()[:3]
+	np.testing.assert_array_equal(final, director.produced[-1])
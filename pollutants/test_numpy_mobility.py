@@ -0,0 +1,132 @@
+import os
+import numpy as np
+import pytest
+
+from pollution_field import PETROIL, GPL, ELECTRIC
+from NumpyMobilityModel import NumpyMobilityModel
+
+
+class NoTurn:
+	#random stream of the cars that never turns them, so that every car goes straight ahead
+	def uniform(self, low, high, size):
+		return np.zeros(size)
+
+
+def diffuse(pollution):
+	#diffuse 0.4 on a wrapped world, patch by patch: 60% stays, 5% goes to each of the 8 neighbours
+	height, width = pollution.shape
+	result = np.zeros_like(pollution)
+	for y in range(height):
+		for x in range(width):
+			for dy in (-1, 0, 1):
+				for dx in (-1, 0, 1):
+					share = 0.6 if dy == dx == 0 else 0.05
+					result[(y + dy) % height, (x + dx) % width] += share * pollution[y, x]
+	return result
+
+
+def still_model(pollution, x, y, heading, fuel):
+	model = NumpyMobilityModel(width=pollution.shape[1], height=pollution.shape[0])
+	model.setup(len(fuel))
+	model.rng = NoTurn()
+	model.pollution = np.array(pollution, dtype=float)
+	model.x, model.y = np.array(x, dtype=float), np.array(y, dtype=float)
+	model.heading = np.array(heading, dtype=float)
+	model.fuel = np.array(fuel, dtype=np.int8)
+	model.totals = np.bincount(model.fuel, minlength=3)[:3]
+	return model
+
+
+def test_emission_decay_and_clamp():
+	pollution = np.zeros((4, 5))
+	pollution[2, 2] = 3
+	pollution[3, 4] = 0.01                                  #falls below 0 after the decay
+	pollution[0, 1] = 1
+	#two petroil and a GPL car end on [1, 0], a GPL car on [0, 3], the electric car on [3, 1]
+	model = still_model(pollution,
+		x=[0.5, 0.5, 0.5, 2.5, 1.5], y=[0.5, 0.5, 0.5, 0.5, 2.5], heading=[0, 0, 0, 90, 0],
+		fuel=[PETROIL, PETROIL, GPL, GPL, ELECTRIC])
+	model.step()
+
+	expected = np.full((4, 5), 0.00008 * 1 - 0.02)
+	expected[2, 2] += 3
+	expected[3, 4] = 0
+	expected[0, 1] += 1
+	expected[1, 0] += 1.2 + 0.6                             #every fuel emits once per patch, whatever its number of cars
+	expected[0, 3] += 0.6
+	expected = np.maximum(expected, 0)
+	np.testing.assert_allclose(model.pollution, diffuse(expected), atol=1e-12)
+	np.testing.assert_allclose(model.cells(), [5, 5, 5, 3, 16])
+
+
+def test_diffuse_wraps_and_conserves():
+	pollution = np.zeros((4, 5))
+	pollution[0, 0] = 1.02                                  #1 after the decay, the other patches clamp to 0
+	model = still_model(pollution, x=[], y=[], heading=[], fuel=[])
+	model.step()
+
+	expected = np.zeros((4, 5))
+	expected[0, 0] = 0.6
+	for y in (-1, 0, 1):
+		for x in (-1, 0, 1):
+			if y or x:
+				expected[y, x] = 0.05
+	np.testing.assert_allclose(model.pollution, expected, atol=1e-12)
+	assert model.getPollution() == pytest.approx(1)
+
+
+def test_diffuse_conserves_random_field():
+	model = NumpyMobilityModel(width=7, height=6, seed=3)
+	model.setup(0)
+	model.pollution = np.random.default_rng(3).uniform(1, 5, (6, 7))
+	before = model.pollution.sum() - 0.02 * model.pollution.size
+	model.step()
+	assert model.getPollution() == pytest.approx(before)
+
+
+def test_update_vehicles():
+	model = NumpyMobilityModel(seed=1)
+	model.setup(200)
+	#as update-vehicles, only petroil and GPL cars can be taken away, and only GPL and electric cars added
+	for mix in ((150, 30, 20), (100, 40, 60), (80, 30, 90)):
+		model.update_vehicles(*mix)
+		counts = model.export_state().fuel_counts()
+		assert tuple(counts[:3]) == mix
+		assert counts.sum() == 200
+
+
+def run(model, population=200, couplings=20, update_frequency=30):
+	#pollution after every coupling, the cars going from petroil to GPL and electric; pollution field at the end
+	model.setup(population)
+	series = []
+	for k in range(1, couplings + 1):
+		model.advance(update_frequency)
+		series.append(model.getPollution())
+		model.update_vehicles(population - 10 * k, 5 * k, 5 * k)
+	return np.array(series), model.export_state().pollution
+
+
+def test_same_statistics_as_netlogo():
+	pytest.importorskip("pyNetLogo")
+	NetLogoPath = os.environ.get("NETLOGO_HOME")
+	if not NetLogoPath:
+		pytest.skip("NETLOGO_HOME is not set")
+	from MobilityModel import MobilityModel
+
+	modelPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pollution.nlogo")
+	netlogo = MobilityModel(modelPath, NetLogoPath, os.environ.get("NETLOGO_VERSION", "6.0"), gui=False)
+	seeds = range(5)
+	runs = {"netlogo": [], "numpy": []}
+	try:
+		for seed in seeds:
+			netlogo.netlogo.command("random-seed " + str(seed))
+			runs["netlogo"].append(run(netlogo))
+			runs["numpy"].append(run(NumpyMobilityModel(seed=seed)))
+	finally:
+		netlogo.netlogo.kill_workspace()
+
+	series = {name: np.mean([s for s, _ in result], axis=0) for name, result in runs.items()}
+	fields = {name: [f for _, f in result] for name, result in runs.items()}
+	np.testing.assert_allclose(series["numpy"], series["netlogo"], rtol=0.1)
+	np.testing.assert_allclose(np.mean([f.mean() for f in fields["numpy"]]), np.mean([f.mean() for f in fields["netlogo"]]), rtol=0.1)
+	np.testing.assert_allclose(np.mean([f.var() for f in fields["numpy"]]), np.mean([f.var() for f in fields["netlogo"]]), rtol=0.25)
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from scipy.integrate import odeint
+
+from ode_model import ODEModel
+
+
+def scenarios(n=50, seed=0):
+	#random vehicles and incentives, some of them 0 (no vehicle changes fuel)
+	rng = np.random.default_rng(seed)
+	states = rng.integers(0, 300, (n, 3))
+	incentives = rng.uniform(0, 0.1, n)
+	incentives[::5] = 0
+	return states, incentives
+
+
+@pytest.mark.parametrize("t", [1, 2.5])
+def test_propagator_matches_odeint(t):
+	model = ODEModel()
+	states, incentives = scenarios()
+	for state, incentive in zip(states, incentives):
+		β, σ, γ = 0.1 * incentive, 0.08 * incentive, 0.02 * incentive
+		expected = odeint(model.pollution_model, state.astype(float), [0, t], args=(β, σ, γ), rtol=1e-12, atol=1e-12)[-1]
+		np.testing.assert_allclose(model.propagator(incentive, t) @ state, expected, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("t", [1, 2.5])
+def test_advance_batch_matches_advance(t):
+	model = ODEModel()
+	states, incentives = scenarios(seed=1)
+	batch = model.advance_batch(states, incentives, t)
+	expected = np.array([model.advance(*state, incentive, t) for state, incentive in zip(states, incentives)])
+	#both are truncated to ints, a value within the error of odeint from an integer may end on either side
+	np.testing.assert_allclose(batch, expected, atol=1)
+	np.testing.assert_array_equal(batch[incentives == 0], states[incentives == 0])
+
+
+def test_advance_batch_scalar_incentive():
+	model = ODEModel()
+	states, _ = scenarios(seed=2)
+	for incentive in (0, 0.04):
+		np.testing.assert_array_equal(model.advance_batch(states, incentive),
+			model.advance_batch(states, np.full(len(states), incentive)))
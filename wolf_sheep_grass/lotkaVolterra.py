@@ -5,13 +5,26 @@ import os
 #sys.path.append("/usr/lib64/python3.10/site-packages")
 import numpy as np
 import pylab as plt
-from scipy.integrate import odeint
+from scipy.integrate import odeint, solve_ivp
 from GEMMA_Interfaces import GEMMA_Component
 
 
 
 class LotkaVolterra(GEMMA_Component):
 
+    # "euler": explicit Euler over the whole time grid, keeping the trajectories (reference)
+    # "euler_final": the same Euler steps, keeping only the current state
+    # "adaptive": error-controlled Runge-Kutta (solve_ivp), solves the equations up to the tolerance instead of the Euler discretization
+    INTEGRATORS = ("euler", "euler_final", "adaptive")
+
+    def __init__(self, integrator="euler", rtol=1e-6, atol=1e-9):
+        super().__init__()
+        if integrator not in self.INTEGRATORS:
+            raise ValueError("unknown integrator " + str(integrator) + ", expected one of " + str(self.INTEGRATORS))
+        self.parameters["integrator"] = integrator
+        self.parameters["rtol"] = rtol                  #tolerances of the adaptive integrator
+        self.parameters["atol"] = atol
+
 
 
     def LotkaVolterra_EEuler(self, R0, F0, alpha, beta, gamma, delta, t):
@@ -36,6 +49,26 @@ class LotkaVolterra(GEMMA_Component):
      return R,F
 
 
+    def LotkaVolterra_EEuler_final(self, R0, F0, alpha, beta, gamma, delta, t_end, steps):
+        # Same explicit Euler method, with steps constant time steps from 0 to t_end, returning only the final populations
+        dt = t_end / steps
+        a, b, g, d = alpha*dt, beta*dt, gamma*dt, delta*dt
+        R, F = float(R0), float(F0)
+        for n in range(steps):
+            R, F = R*(1 + a - g*F), F*(1 - b + d*R)
+        return R, F
+
+
+    def LotkaVolterra_adaptive(self, R0, F0, alpha, beta, gamma, delta, t_end):
+        # Error-controlled integration of the Lotka-Volterra equations, returning only the final populations
+        def derivatives(t, y):
+            R, F = y
+            return alpha*R - gamma*R*F, -beta*F + delta*R*F
+        res = solve_ivp(derivatives, (0, t_end), (R0, F0), method="RK45", t_eval=(t_end,),
+                        rtol=self.parameters["rtol"], atol=self.parameters["atol"])
+        return res.y[0, -1], res.y[1, -1]
+
+
 
     def setup():
         pass
@@ -44,6 +77,10 @@ class LotkaVolterra(GEMMA_Component):
         t = np.linspace(0,5,3000) 
 
         alpha, beta, gamma, delta = 1.2, 2, 0.02, 0.03
+        if self.parameters["integrator"] == "euler_final":
+            return self.LotkaVolterra_EEuler_final(R0, F0, alpha, beta, gamma, delta, t[-1], len(t) - 1)
+        if self.parameters["integrator"] == "adaptive":
+            return self.LotkaVolterra_adaptive(R0, F0, alpha, beta, gamma, delta, t[-1])
          # Actually solve the problem
         R, F = self.LotkaVolterra_EEuler(R0, F0, alpha, beta, gamma, delta, t)
         return self.retrieve_results (R, F)
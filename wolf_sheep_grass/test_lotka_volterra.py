@@ -0,0 +1,44 @@
+import timeit
+import numpy as np
+import pytest
+from scipy.integrate import odeint
+
+from lotkaVolterra import LotkaVolterra
+
+
+ALPHA, BETA, GAMMA, DELTA = 1.2, 2, 0.02, 0.03          #parameters of LotkaVolterra.advance
+T_END = 5
+POPULATIONS = [(100, 50), (60, 40), (200, 10), (5, 80)]
+
+
+def reference(R0, F0):
+    #tight-tolerance solution of the equations, independent of the Euler discretization
+    def derivatives(y, t):
+        R, F = y
+        return ALPHA*R - GAMMA*R*F, -BETA*F + DELTA*R*F
+    return odeint(derivatives, (R0, F0), (0, T_END), rtol=1e-12, atol=1e-12)[-1]
+
+
+@pytest.mark.parametrize("R0, F0", POPULATIONS)
+def test_euler_final_matches_euler(R0, F0):
+    np.testing.assert_allclose(LotkaVolterra("euler_final").advance(R0, F0),
+                               LotkaVolterra("euler").advance(R0, F0), rtol=1e-9)
+
+
+@pytest.mark.parametrize("R0, F0", POPULATIONS)
+def test_adaptive_matches_reference(R0, F0):
+    np.testing.assert_allclose(LotkaVolterra("adaptive").advance(R0, F0), reference(R0, F0), rtol=1e-4)
+    np.testing.assert_allclose(LotkaVolterra("adaptive", rtol=1e-10, atol=1e-10).advance(R0, F0),
+                               reference(R0, F0), rtol=1e-7)
+
+
+def test_euler_final_is_faster_than_euler():
+    euler, euler_final = LotkaVolterra("euler"), LotkaVolterra("euler_final")
+    slow = min(timeit.repeat(lambda: euler.advance(100, 50), number=20, repeat=5))
+    fast = min(timeit.repeat(lambda: euler_final.advance(100, 50), number=20, repeat=5))
+    assert fast < slow
+
+
+def test_unknown_integrator():
+    with pytest.raises(ValueError):
+        LotkaVolterra("rk4")
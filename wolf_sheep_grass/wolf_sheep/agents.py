@@ -27,16 +27,20 @@ class Sheep(RandomWalker):
             self.energy -= 1
 
             # If there is grass available, eat it
-            this_cell = self.model.grid.get_cell_list_contents([self.pos])
-            grass_patch = [obj for obj in this_cell if isinstance(obj, GrassPatch)][0]
-            if grass_patch.fully_grown:
-                self.energy += self.model.sheep_gain_from_food
-                grass_patch.fully_grown = False
+            if self.model.grass_arrays:
+                if self.model.grass_fully_grown[self.pos]:
+                    self.energy += self.model.sheep_gain_from_food
+                    self.model.grass_fully_grown[self.pos] = False
+            else:
+                this_cell = self.model.grid.get_cell_list_contents([self.pos])
+                grass_patch = [obj for obj in this_cell if isinstance(obj, GrassPatch)][0]
+                if grass_patch.fully_grown:
+                    self.energy += self.model.sheep_gain_from_food
+                    grass_patch.fully_grown = False
 
             # Death
             if self.energy < 0:
-                self.model.grid.remove_agent(self)
-                self.model.schedule.remove(self)
+                self.model.kill_sheep(self)
                 living = False
 
         if living and self.random.random() < self.model.sheep_reproduce:
@@ -46,8 +50,7 @@ class Sheep(RandomWalker):
             lamb = Sheep(
                 self.model.next_id(), self.pos, self.model, self.moore, self.energy
             )
-            self.model.grid.place_agent(lamb, self.pos)
-            self.model.schedule.add(lamb)
+            self.model.place_sheep(lamb, self.pos)
 
 
 '''
@@ -117,6 +120,6 @@ class GrassPatch(mesa.Agent):
             if self.countdown <= 0:
                 # Set as fully grown
                 self.fully_grown = True
-                self.countdown = self.model.grass_regrowth_time
+                self.countdown = self.model.parameters["grass_regrowth_time"]
             else:
                 self.countdown -= 1
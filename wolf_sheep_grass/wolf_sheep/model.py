@@ -10,6 +10,7 @@ Replication of the model found in NetLogo:
 """
 
 import mesa
+import numpy as np
 from lotkaVolterra import LotkaVolterra
 
 from wolf_sheep.scheduler import RandomActivationByTypeFiltered
@@ -54,7 +55,9 @@ class WolfSheep(mesa.Model, GEMMA_Director):
         initial_wolves=50,
         sheep_reproduce=0.04,
         lotkaVolterraCallFrequency = 10,
+        lotkaVolterraIntegrator = "euler",
         grass=False,
+        grass_arrays=False,
         grass_regrowth_time=30,
         sheep_gain_from_food=4,
     ):
@@ -68,9 +71,12 @@ class WolfSheep(mesa.Model, GEMMA_Director):
             wolf_reproduce: Probability of each wolf reproducing each step
             wolf_gain_from_food: Energy a wolf gains from eating a sheep
             grass: Whether to have the sheep eat grass for energy
+            grass_arrays: Whether to store the grass in two arrays, grass_fully_grown and
+                          grass_countdown indexed by [x, y], instead of one GrassPatch agent per cell
             grass_regrowth_time: How long it takes for a grass patch to regrow
                                  once it is eaten
             sheep_gain_from_food: Energy sheep gain from grass, if enabled.
+            lotkaVolterraIntegrator: Integrator of the Lotka-Volterra model, one of LotkaVolterra.INTEGRATORS
         """
         super().__init__()
         # Set parameters
@@ -81,9 +87,11 @@ class WolfSheep(mesa.Model, GEMMA_Director):
         self.wolves = initial_wolves
         self.parameters["sheep_reproduce"] = sheep_reproduce
         self.grass = grass
+        self.grass_arrays = grass and grass_arrays
         self.parameters["grass_regrowth_time"] = grass_regrowth_time
         self.parameters["sheep_gain_from_food"] = sheep_gain_from_food
         self.parameters["frequencyOfCall"] = lotkaVolterraCallFrequency
+        self.parameters["integrator"] = lotkaVolterraIntegrator
         self.parameters["total_steps"] = 200
         self.sub_models = {}
         self.instantiate_sub_models()
@@ -91,7 +99,7 @@ class WolfSheep(mesa.Model, GEMMA_Director):
 
 
     def instantiate_sub_models (self, *args):
-        self.sub_models ["LotkaVolterra"] = LotkaVolterra() 
+        self.sub_models ["LotkaVolterra"] = LotkaVolterra(self.parameters["integrator"]) 
 
 
     def step(self):
@@ -102,33 +110,34 @@ class WolfSheep(mesa.Model, GEMMA_Director):
     def setup (self):
         self.resultFile = "res.txt"
         self.resList = [] 
+        self.grass_fully_grown, self.grass_countdown = None, None         #grass arrays, with grass_arrays
+        self.sheep_list = []                                              #all the living sheep, in no particular order
+        self.sheep_index = {}                                             #unique_id of a sheep --> its position in sheep_list
 
         self.schedule = RandomActivationByTypeFiltered(self)
         self.grid = mesa.space.MultiGrid(self.parameters["width"], self.parameters["height"], torus=True)
         self.datacollector = mesa.DataCollector(
             {
                 #"Wolves": lambda m: m.schedule.get_type_count(Wolf),
-                "Sheep": lambda m: m.schedule.get_type_count(Sheep),
-                "Grass": lambda m: m.schedule.get_type_count(
-                    GrassPatch, lambda x: x.fully_grown
-                ),
+                "Sheep": lambda m: len(m.sheep_list),
+                "Grass": lambda m: m.count_grass(),
             }
         )         
 
         self.running = True
         self.datacollector.collect(self)
          # Create sheep:
-        for i in range(self.parameters["initial_sheep"]):
-            x = self.random.randrange(self.parameters["width"])
-            y = self.random.randrange(self.parameters["height"])
-            energy = self.random.randrange(2 * self.parameters["sheep_gain_from_food"])
-            sheep = Sheep(self.next_id(), (x, y), self, True, energy)
-            self.grid.place_agent(sheep, (x, y))
-            self.schedule.add(sheep)
+        self.add_sheep(self.parameters["initial_sheep"])
 
        
         # Create grass patches
-        if self.grass:
+        if self.grass_arrays:
+            shape = (self.parameters["width"], self.parameters["height"])
+            rng = np.random.default_rng(self.random.getrandbits(64))           #drawn from the random generator of the model, for reproducibility
+            self.grass_fully_grown = rng.random(shape) < 0.5
+            self.grass_countdown = np.where(self.grass_fully_grown, self.parameters["grass_regrowth_time"],
+                                            rng.integers(0, self.parameters["grass_regrowth_time"], shape))
+        elif self.grass:
             for agent, x, y in self.grid.coord_iter():
 
                 fully_grown = self.random.choice([True, False])
@@ -145,26 +154,21 @@ class WolfSheep(mesa.Model, GEMMA_Director):
     def advance(self):
         if self.schedule.time < self.parameters["total_steps"]:
             self.schedule.step()
+            if self.grass_arrays:
+                self.grow_grass()
             # collect data
             self.datacollector.collect(self)
 
             if  self.sub_models["LotkaVolterra"].check_call_conditions(self, self.schedule.time , self.parameters["frequencyOfCall"]) == True:
-                sheeps, wolves = self.sub_models["LotkaVolterra"].advance(self.schedule.get_type_count(Sheep), int(self.wolves))              #calling lotka volterra model for sheep-wolves regulation
+                sheeps, wolves = self.sub_models["LotkaVolterra"].advance(len(self.sheep_list), int(self.wolves))              #calling lotka volterra model for sheep-wolves regulation
                 sheeps, wolves = self.sub_models["LotkaVolterra"].check_consistency(self, sheeps, wolves)
                 self.resList.append("At " + str(self.schedule.time) + "  there are " + str(sheeps) + " sheeps and " + str(wolves) + " wolves\n")
                 self.wolves = wolves                                                                            #number of wolves updated
-                sheepsDifferential = sheeps - self.schedule.get_type_count(Sheep)
+                sheepsDifferential = sheeps - len(self.sheep_list)
                 if sheepsDifferential > 0:                                                                              #a certain number of sheep must be created
-                    for i in range (sheepsDifferential):
-                        x = self.random.randrange(self.parameters["width"])
-                        y = self.random.randrange(self.parameters["height"])
-                        energy = self.random.randrange(2 * self.parameters["sheep_gain_from_food"])
-                        sheep = Sheep(self.next_id(), (x, y), self, True, energy)
-                        self.grid.place_agent(sheep, (x, y))
-                        self.schedule.add(sheep)
-                else:                                                                                                   #a certain number of sheep must eliminated from agents' list
-                    for i in range (sheepsDifferential):
-                        self.schedule.agents().pop(self.random.randrange(len(schedule.agents())))
+                    self.add_sheep(sheepsDifferential)
+                elif sheepsDifferential < 0:                                                                            #a certain number of sheep must be eliminated
+                    self.remove_sheep(-sheepsDifferential)
 
 
             if self.verbose:
@@ -172,8 +176,8 @@ class WolfSheep(mesa.Model, GEMMA_Director):
                     [
                         self.schedule.time,
                         #self.schedule.get_type_count(Wolf),
-                        self.schedule.get_type_count(Sheep),
-                        self.schedule.get_type_count(GrassPatch, lambda x: x.fully_grown),
+                        len(self.sheep_list),
+                        self.count_grass(),
                     ]
                 )
 
@@ -182,13 +186,63 @@ class WolfSheep(mesa.Model, GEMMA_Director):
             self.retrieve_results()
 
 
+    def add_sheep(self, k):
+        # Create k sheep in random cells, with random energy
+        width, height = self.parameters["width"], self.parameters["height"]
+        for i in range(k):
+            x, y = self.random.randrange(width), self.random.randrange(height)
+            energy = self.random.randrange(2 * self.parameters["sheep_gain_from_food"])
+            self.place_sheep(Sheep(self.next_id(), (x, y), self, True, energy), (x, y))
+
+
+    def remove_sheep(self, k):
+        # Remove k sheep chosen at random (or all of them, if there are less than k), in O(k)
+        for i in range(min(k, len(self.sheep_list))):
+            self.kill_sheep(self.sheep_list[self.random.randrange(len(self.sheep_list))])
+
+
+    def place_sheep(self, sheep, pos):
+        # Put a new sheep on the grid and in the scheduler
+        self.grid.place_agent(sheep, pos)
+        self.schedule.add(sheep)
+        self.sheep_index[sheep.unique_id] = len(self.sheep_list)
+        self.sheep_list.append(sheep)
+
+
+    def kill_sheep(self, sheep):
+        # Remove a sheep from the grid and the scheduler; the last sheep of sheep_list takes its place in the list
+        self.grid.remove_agent(sheep)
+        self.schedule.remove(sheep)
+        index = self.sheep_index.pop(sheep.unique_id)
+        last = self.sheep_list.pop()
+        if last is not sheep:
+            self.sheep_list[index] = last
+            self.sheep_index[last.unique_id] = index
+
+
+    def grow_grass(self):
+        # Same as GrassPatch.step, for all the cells at once
+        growing = ~self.grass_fully_grown
+        regrown = growing & (self.grass_countdown <= 0)
+        self.grass_countdown[growing & ~regrown] -= 1
+        self.grass_fully_grown[regrown] = True
+        self.grass_countdown[regrown] = self.parameters["grass_regrowth_time"]
+
+
+    def count_grass(self):
+        # Number of cells with fully grown grass
+        if self.grass_fully_grown is not None:
+            return int(self.grass_fully_grown.sum())
+        return self.schedule.get_type_count(GrassPatch, lambda x: x.fully_grown)
+
+
     def retrieve_results(self): 
         print("")
         #print("Final number wolves: ", self.schedule.get_type_count(Wolf))
-        print("Final number sheep: ", self.schedule.get_type_count(Sheep))
+        print("Final number sheep: ", len(self.sheep_list))
         print(
             "Final number grass: ",
-            self.schedule.get_type_count(GrassPatch, lambda x: x.fully_grown),
+            self.count_grass(),
         )
         with open (self.resultFile, 'a') as r:                                                                 #output function: write epidemic progress at each step
             for elem in self.resList:
@@ -1,4 +1,5 @@
 import mesa
+import numpy as np
 
 #from wolf_sheep.agents import Wolf, Sheep, GrassPatch
 from wolf_sheep.agents import Sheep, GrassPatch
@@ -18,20 +19,42 @@ def wolf_sheep_portrayal(agent):
         portrayal["Layer"] = 1
 
     elif type(agent) is GrassPatch:
-        if agent.fully_grown:
-            portrayal["Color"] = ["#00FF00", "#00CC00", "#009900"]
-        else:
-            portrayal["Color"] = ["#84e184", "#adebad", "#d6f5d6"]
-        portrayal["Shape"] = "rect"
-        portrayal["Filled"] = "true"
-        portrayal["Layer"] = 0
-        portrayal["w"] = 1
-        portrayal["h"] = 1
+        portrayal = grass_portrayal(agent.fully_grown)
 
     return portrayal
 
 
-canvas_element = mesa.visualization.CanvasGrid(wolf_sheep_portrayal, 20, 20, 500, 500)
+def grass_portrayal(fully_grown):
+    portrayal = {}
+    if fully_grown:
+        portrayal["Color"] = ["#00FF00", "#00CC00", "#009900"]
+    else:
+        portrayal["Color"] = ["#84e184", "#adebad", "#d6f5d6"]
+    portrayal["Shape"] = "rect"
+    portrayal["Filled"] = "true"
+    portrayal["Layer"] = 0
+    portrayal["w"] = 1
+    portrayal["h"] = 1
+    return portrayal
+
+
+class GrassCanvasGrid(mesa.visualization.CanvasGrid):
+    """
+    CanvasGrid that also draws the grass stored in the arrays of the model, when there are no GrassPatch agents
+    """
+
+    def render(self, model):
+        grid_state = super().render(model)
+        if getattr(model, "grass_arrays", False):
+            for (x, y), fully_grown in np.ndenumerate(model.grass_fully_grown):
+                portrayal = grass_portrayal(fully_grown)
+                portrayal["x"] = x
+                portrayal["y"] = y
+                grid_state[portrayal["Layer"]].append(portrayal)
+        return grid_state
+
+
+canvas_element = GrassCanvasGrid(wolf_sheep_portrayal, 20, 20, 500, 500)
 chart_element = mesa.visualization.ChartModule(
     [
         #{"Label": "Wolves", "Color": "#AA0000"},
@@ -71,6 +94,7 @@ model_params = {
     # The following line is an example to showcase StaticText.
     "title": mesa.visualization.StaticText("Parameters:"),
     "grass": mesa.visualization.Checkbox("Grass Enabled", True),
+    "grass_arrays": mesa.visualization.Checkbox("Grass Stored in Arrays", False),
     "grass_regrowth_time": mesa.visualization.Slider("Grass Regrowth Time", 20, 1, 50),
     "initial_sheep": mesa.visualization.Slider(
         "Initial Sheep Population", 50, 10, 300